@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+OVS-free controller benchmark: SdnPpoController against fake datapaths.
+
+Runs on a plain Linux box (Ryu venv + numpy + mininet python package, no sudo):
+  python3 -m ryu_app.bench_controller --topo fattree --flows 2000 --pi_rate 500 --rest_rate 20 --duration_s 5
+  python3 -m ryu_app.bench_controller --topo fattree --routing ecmp_group
+
+Reports
+- packet-ins/sec handled flat out, FlowMods and PacketOuts emitted per flow
+- PacketOuts per ARP request (proxied reply vs. flood; --proxy_arp 0 --flood all is the old behaviour)
+- port-stats-reply processing time per reply
+- a paced mixed load (packet-ins + per-switch stats replies + GET /sdnppo/state),
+  processed in schedule order on one thread like the Ryu hub; latencies are
+  completion minus scheduled time, so they include backlog behind other events
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from ryu.ofproto import ofproto_v1_3_parser as parser
+
+from .harness import Harness, arp_request_frame
+
+def pct(xs, q):
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * (len(xs) - 1) + 0.5))]
+
+def bench_packet_in(h: Harness, flows: int, dup: int, seed: int):
+    rng = random.Random(seed)
+    hosts = h.topo.hosts
+    h.clear()
+    lat = []
+    t0 = time.perf_counter()
+    for i in range(flows):
+        a, b = rng.sample(hosts, 2)
+        sport = 10000 + i % 50000
+        dport = rng.choice([5201, 5202, 5203, 5204])
+        for _ in range(1 + dup):
+            t1 = time.perf_counter()
+            h.flow_packet_in(a, b, sport, dport)
+            lat.append(time.perf_counter() - t1)
+    el = time.perf_counter() - t0
+    n_pi = flows * (1 + dup)
+    return {
+        "packet_ins": n_pi,
+        "packet_ins_per_s": n_pi / el,
+        "pi_us_mean": 1e6 * statistics.mean(lat),
+        "pi_us_p99": 1e6 * pct(lat, 0.99),
+        "flowmods_per_flow": len(h.sent(parser.OFPFlowMod)) / flows,
+        "packetouts_per_flow": len(h.sent(parser.OFPPacketOut)) / flows,
+        "groupmods": len(h.sent(parser.OFPGroupMod)),
+        "pending_hits": h.app.counters["pending_hits"],
+    }
+
+def bench_arp(h: Harness, n: int, seed: int, storm_limit: int = 1000):
+    """ARP requests for random known hosts, cascaded through the fabric (capped at storm_limit packet-ins each)."""
+    rng = random.Random(seed + 2)
+    hosts = h.topo.hosts
+    h.clear()
+    before = dict(h.app.counters)
+    fabric_pi = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        a, b = rng.sample(hosts, 2)
+        h.packet_in(a.dpid, a.port, arp_request_frame(a, b.ip))
+        fabric_pi += h.propagate(limit=storm_limit)
+    el = time.perf_counter() - t0
+    c = h.app.counters
+    return {
+        "arp_per_s": n / el,
+        "arp_pktouts_per_req": (c["flood_pktout"] - before["flood_pktout"] + c["arp_proxied"]
+                                    - before["arp_proxied"] + c["arp_unicast"] - before["arp_unicast"]) / n,
+        "arp_fabric_pi_per_req": fabric_pi / n,
+        "arp_proxied": c["arp_proxied"] - before["arp_proxied"],
+        "arp_flood_pktouts": c["flood_pktout"] - before["flood_pktout"],
+    }
+
+def bench_stats(h: Harness, rounds: int):
+    dpids = list(h.dps)
+    lat = []
+    for _ in range(rounds):
+        h.start_stats_round()
+        for d in dpids:
+            t1 = time.perf_counter()
+            h.port_stats(d, tx_mbps=8.0)
+            lat.append(time.perf_counter() - t1)
+    return {
+        "stats_replies": len(lat),
+        "stats_us_mean": 1e6 * statistics.mean(lat),
+        "stats_us_p99": 1e6 * pct(lat, 0.99),
+    }
+
+def bench_mixed(h: Harness, duration_s: float, pi_rate: float, rest_rate: float,
+                stats_interval_s: float, seed: int):
+    rng = random.Random(seed + 1)
+    hosts = h.topo.hosts
+    sched = []
+    t = 0.0
+    while pi_rate > 0 and t < duration_s:
+        t += rng.expovariate(pi_rate)
+        sched.append((t, "pi"))
+    t = 0.0
+    while rest_rate > 0 and t < duration_s:
+        t += 1.0 / rest_rate
+        sched.append((t, "rest"))
+    t = 0.0
+    while t < duration_s:
+        sched.append((t, ("round",)))
+        for d in h.dps:
+            sched.append((t, ("stats", d)))
+        t += stats_interval_s
+    sched.sort(key=lambda x: x[0])
+
+    lat = {"pi": [], "rest": [], "stats": []}
+    sport = 0
+    t0 = time.perf_counter()
+    for ts, kind in sched:
+        wait = ts - (time.perf_counter() - t0)
+        if wait > 0:
+            time.sleep(wait)
+        if kind == "pi":
+            a, b = rng.sample(hosts, 2)
+            sport += 1
+            h.flow_packet_in(a, b, 20000 + sport % 40000, 5203)
+            key = "pi"
+        elif kind == "rest":
+            h.rest("GET", "/sdnppo/state")
+            key = "rest"
+        elif kind[0] == "round":
+            h.start_stats_round()
+            continue
+        else:
+            h.port_stats(kind[1], tx_mbps=8.0)
+            key = "stats"
+        lat[key].append(time.perf_counter() - t0 - ts)
+    el = time.perf_counter() - t0
+    out = {"mixed_wall_s": el, "mixed_lag_s": max(0.0, el - duration_s)}
+    for k, xs in lat.items():
+        out[f"{k}_n"] = len(xs)
+        out[f"{k}_latency_ms_p50"] = 1e3 * pct(xs, 0.50)
+        out[f"{k}_latency_ms_p99"] = 1e3 * pct(xs, 0.99)
+        out[f"{k}_latency_ms_max"] = 1e3 * (max(xs) if xs else 0.0)
+    return out
+
+def main():
+    from sdnppo_mn.run_experiment import TOPOS, add_topo_args, topo_params
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topo", choices=TOPOS, default="leafspine")
+    add_topo_args(ap)
+    ap.add_argument("--routing", choices=["sp", "ecmp_hash", "ecmp_group"], default="sp")
+    ap.add_argument("--proxy_arp", choices=["0", "1"], default="1")
+    ap.add_argument("--flood", choices=["tree", "all"], default="tree")
+    ap.add_argument("--flows", type=int, default=2000)
+    ap.add_argument("--arps", type=int, default=1000)
+    ap.add_argument("--dup", type=int, default=0, help="extra packet-ins per flow before its FlowMods land")
+    ap.add_argument("--stats_rounds", type=int, default=50)
+    ap.add_argument("--duration_s", type=float, default=5.0)
+    ap.add_argument("--pi_rate", type=float, default=500.0, help="packet-ins/s in the mixed run")
+    ap.add_argument("--rest_rate", type=float, default=20.0, help="GET /sdnppo/state per s in the mixed run")
+    ap.add_argument("--stats_interval_s", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default=None)
+    args = ap.parse_args()
+
+    h = Harness(args.topo, env={"SDNPPO_ROUTING": args.routing, "SDNPPO_PROXY_ARP": args.proxy_arp,
+                                "SDNPPO_FLOOD": args.flood}, **topo_params(args.topo, args))
+    res = {"topo": args.topo, "routing": args.routing, "switches": len(h.dps), "hosts": len(h.topo.hosts)}
+    res.update(bench_packet_in(h, args.flows, args.dup, args.seed))
+    res.update(bench_arp(h, args.arps, args.seed))
+    res.update(bench_stats(h, args.stats_rounds))
+    h.app.reset_metrics()
+    res.update(bench_mixed(h, args.duration_s, args.pi_rate, args.rest_rate, args.stats_interval_s, args.seed))
+    for k, v in res.items():
+        print(f"{k:>24}: {v:.3f}" if isinstance(v, float) else f"{k:>24}: {v}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+
+if __name__ == "__main__":
+    main()
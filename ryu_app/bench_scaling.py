@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Controller scaling benchmark on generated topologies (no OVS/Mininet network).
+
+For each topology size it reports:
+- rebuild_ms:     one load_topology() (what every EventSwitchEnter/EventLinkAdd costs)
+- startup_s:      rebuild_ms x (switches + links) events seen while the fabric comes up
+- path_us:        one shortest_path() between random host attachment switches
+- flowmods/flow:  messages install_path() sends per flow, with serialized bytes
+- install_us:     install_path() per flow
+
+Usage (repo root, Ryu venv):
+  python3 -m ryu_app.bench_scaling --sizes fattree:4,8,12,16 leafspine:4x16,8x64,16x256 randwan:50,200,400
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from .harness import SyntheticTopo, attach, make_controller
+
+def parse_sizes(specs):
+    """'fattree:4,8' -> [('fattree', {'k': 4}), ...]; leafspine uses SPINESxLEAVES."""
+    out = []
+    for spec in specs:
+        name, _, vals = spec.partition(":")
+        for v in [x for x in vals.split(",") if x]:
+            if name == "fattree":
+                out.append((name, {"k": int(v)}))
+            elif name == "leafspine":
+                s, l = v.split("x")
+                out.append((name, {"spines": int(s), "leaves": int(l), "hosts_per_leaf": 2}))
+            elif name == "randwan":
+                out.append((name, {"nodes": int(v), "degree": 3.0, "seed": 1}))
+            else:
+                raise ValueError(spec)
+    return out
+
+def bench_one(topo_name, topo_kw, flows=200, paths=2000, rebuilds=5, seed=12345):
+    topo = SyntheticTopo.build(topo_name, **topo_kw)
+    app = make_controller()
+    dps = attach(app, topo)
+    n_sw = len(topo.switch_list)
+    n_links = len(topo.link_list)
+
+    samples = []
+    for _ in range(rebuilds):
+        t0 = time.perf_counter()
+        app.load_topology(topo.switch_list, topo.link_list)
+        samples.append(time.perf_counter() - t0)
+    rebuild_s = statistics.median(samples)
+
+    rng = random.Random(seed)
+    pairs = [rng.sample(topo.hosts, 2) for _ in range(paths)]
+    t0 = time.perf_counter()
+    for a, b in pairs:
+        app.shortest_path(a.dpid, b.dpid)
+    path_s = (time.perf_counter() - t0) / max(1, len(pairs))
+
+    for dp in dps.values():
+        dp.clear()
+    parser = next(iter(dps.values())).ofproto_parser
+    t0 = time.perf_counter()
+    for i, (a, b) in enumerate(pairs[:flows]):
+        path = app.shortest_path(a.dpid, b.dpid)
+        match = parser.OFPMatch(eth_type=0x0800, ipv4_src=a.ip, ipv4_dst=b.ip, ip_proto=17,
+                                udp_src=40000 + i, udp_dst=5203)
+        app.install_path(path, match, b.port, metered_src_switch=a.dpid)
+    install_s = (time.perf_counter() - t0) / max(1, flows)
+
+    msgs = [m for dp in dps.values() for m in dp.sent]
+    n_bytes = 0
+    for m in msgs:
+        m.serialize()
+        n_bytes += len(m.buf)
+    return {
+        "topo": topo_name, **topo_kw,
+        "switches": n_sw, "links": n_links, "hosts": len(topo.hosts),
+        "rebuild_ms": rebuild_s * 1e3,
+        "startup_s": rebuild_s * (n_sw + n_links),
+        "path_us": path_s * 1e6,
+        "flowmods_per_flow": len(msgs) / max(1, flows),
+        "flowmod_bytes_per_flow": n_bytes / max(1, flows),
+        "install_us": install_s * 1e6,
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", default=["fattree:4,8,12,16", "leafspine:2x4,8x64,16x256", "randwan:6,100,400"])
+    ap.add_argument("--flows", type=int, default=200)
+    ap.add_argument("--paths", type=int, default=2000)
+    ap.add_argument("--json", default=None, help="also write the rows to this file")
+    args = ap.parse_args()
+
+    rows = []
+    print(f"{'topo':<10} {'switches':>8} {'links':>6} {'rebuild_ms':>10} {'startup_s':>9} "
+          f"{'path_us':>8} {'fm/flow':>7} {'B/flow':>7} {'install_us':>10}")
+    for name, kw in parse_sizes(args.sizes):
+        r = bench_one(name, kw, flows=args.flows, paths=args.paths)
+        rows.append(r)
+        print(f"{name:<10} {r['switches']:>8} {r['links']:>6} {r['rebuild_ms']:>10.2f} {r['startup_s']:>9.2f} "
+              f"{r['path_us']:>8.1f} {r['flowmods_per_flow']:>7.2f} {r['flowmod_bytes_per_flow']:>7.0f} "
+              f"{r['install_us']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+In-process fixtures for exercising SdnPpoController without OVS, Mininet or sudo.
+
+- FakeDatapath records every send_msg instead of writing to a socket.
+- SyntheticTopo turns a sdnppo_mn topology (via fluidsim.FluidNet) into the
+  switch/link lists ryu.topology.api would return, plus host MAC/IP/port bindings.
+- make_controller() builds the app with a private WSGIApplication and stops its
+  background greenthreads, so tests drive stats/cleanup explicitly.
+- Harness bundles the three and synthesizes packet-in / port-stats-reply events
+  and in-process REST calls (through the same WSGI routing as ryu-manager);
+  propagate() plays switches without flow entries: PacketOuts leaving on fabric
+  ports come back as packet-ins at the peer switch (how floods cascade).
+
+Needs ryu, numpy and the mininet python package (for the Topo classes) only.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+from typing import Dict, Optional
+
+from ryu.app.wsgi import WSGIApplication
+from ryu.controller import ofp_event
+from ryu.lib import hub
+from ryu.lib.packet import arp, ethernet, ipv4, packet, udp
+from ryu.ofproto import ofproto_v1_3, ofproto_v1_3_parser
+from webob import Request
+
+from .sdnppo_ctrl_meter import SdnPpoController
+
+_Dp = namedtuple("_Dp", "id")
+_Port = namedtuple("_Port", "dpid port_no")
+_Switch = namedtuple("_Switch", "dp ports")
+_Link = namedtuple("_Link", "src dst")
+Host = namedtuple("Host", "name mac ip dpid port")
+
+class FakeDatapath:
+    def __init__(self, dpid: int):
+        self.id = dpid
+        self.ofproto = ofproto_v1_3
+        self.ofproto_parser = ofproto_v1_3_parser
+        self.sent = []
+
+    def send_msg(self, msg):
+        self.sent.append(msg)
+
+    def clear(self):
+        self.sent = []
+
+def host_mac(i: int) -> str:
+    """MAC Mininet's autoSetMacs gives the i-th host (0-based)."""
+    v = i + 1
+    return ":".join(f"{(v >> (8 * b)) & 0xff:02x}" for b in range(5, -1, -1))
+
+class SyntheticTopo:
+    def __init__(self, net):
+        self.net = net
+        self.switch_list = []
+        for d in net.switches:
+            ports = [_Port(d, p) for (sw, p) in net.edges if sw == d]
+            self.switch_list.append(_Switch(_Dp(d), ports))
+        self.link_list = []
+        for a, nbrs in net.port_map.items():
+            for b, pa in nbrs.items():
+                self.link_list.append(_Link(_Port(a, pa), _Port(b, net.port_map[b][a])))
+        self.hosts = [Host(name, host_mac(i), ip, *net.host_loc[name])
+                      for i, (name, ip) in enumerate(net.host_ips)]
+
+    @classmethod
+    def build(cls, topo_name: str, **topo_kw):
+        from sdnppo_mn.fluidsim import build
+        return cls(build(topo_name, **topo_kw))
+
+def make_controller(env: Optional[Dict[str, str]] = None,
+                    wsgi: Optional[WSGIApplication] = None) -> SdnPpoController:
+    """The controller with env applied to os.environ only while it reads its config."""
+    saved = {k: os.environ.get(k) for k in (env or {})}
+    os.environ.update(env or {})
+    try:
+        app = SdnPpoController(wsgi=wsgi if wsgi is not None else WSGIApplication())
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    for th in (app._stats_thread, app._cleanup_thread):
+        hub.kill(th)
+    return app
+
+def attach(app: SdnPpoController, topo: SyntheticTopo) -> Dict[int, FakeDatapath]:
+    """Register one FakeDatapath per switch and load the synthetic topology."""
+    dps = {d: FakeDatapath(d) for d in topo.net.switches}
+    app.datapaths.update(dps)
+    app.load_topology(topo.switch_list, topo.link_list)
+    return dps
+
+def udp_frame(src: Host, dst: Host, sport: int, dport: int, payload: bytes = b"\x00" * 64) -> bytes:
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(dst=dst.mac, src=src.mac, ethertype=0x0800))
+    pkt.add_protocol(ipv4.ipv4(src=src.ip, dst=dst.ip, proto=17))
+    pkt.add_protocol(udp.udp(src_port=sport, dst_port=dport))
+    pkt.add_protocol(payload)
+    pkt.serialize()
+    return bytes(pkt.data)
+
+def arp_request_frame(src: Host, dst_ip: str) -> bytes:
+    pkt = packet.Packet()
+    pkt.add_protocol(ethernet.ethernet(dst="ff:ff:ff:ff:ff:ff", src=src.mac, ethertype=0x0806))
+    pkt.add_protocol(arp.arp(opcode=arp.ARP_REQUEST, src_mac=src.mac, src_ip=src.ip,
+                             dst_mac="00:00:00:00:00:00", dst_ip=dst_ip))
+    pkt.serialize()
+    return bytes(pkt.data)
+
+class Harness:
+    """Controller + fake datapaths on a synthetic topology, driven by synthetic events."""
+
+    def __init__(self, topo_name: str = "leafspine", env: Optional[Dict[str, str]] = None,
+                 seed_hosts: bool = True, **topo_kw):
+        self.topo = SyntheticTopo.build(topo_name, **topo_kw)
+        self.wsgi = WSGIApplication()
+        self.app = make_controller(env, wsgi=self.wsgi)
+        self.dps = attach(self.app, self.topo)
+        self._port_ctr: Dict[tuple, list] = {}
+        self._peer = {}
+        for a, nbrs in self.topo.net.port_map.items():
+            for b, pa in nbrs.items():
+                self._peer[(a, pa)] = (b, self.topo.net.port_map[b][a])
+        if seed_hosts:
+            self.app.learn_hosts([h._asdict() for h in self.topo.hosts])
+
+    # ---- events ---------------------------------------------------------
+    def packet_in(self, dpid: int, in_port: int, data: bytes):
+        dp = self.dps[dpid]
+        msg = ofproto_v1_3_parser.OFPPacketIn(
+            dp, buffer_id=ofproto_v1_3.OFP_NO_BUFFER, total_len=len(data), reason=ofproto_v1_3.OFPR_NO_MATCH,
+            table_id=0, cookie=0, match=ofproto_v1_3_parser.OFPMatch(in_port=in_port), data=data)
+        self.app.packet_in(ofp_event.EventOFPPacketIn(msg))
+
+    def flow_packet_in(self, src: Host, dst: Host, sport: int, dport: int):
+        """First packet of a UDP flow arriving at the source host's edge switch."""
+        self.packet_in(src.dpid, src.port, udp_frame(src, dst, sport, dport))
+
+    def start_stats_round(self):
+        """What stats_loop does each interval (the requests themselves are discarded)."""
+        self.app.request_stats_round()
+        for dp in self.dps.values():
+            dp.sent = [m for m in dp.sent if not isinstance(m, ofproto_v1_3_parser.OFPPortStatsRequest)]
+
+    def stats_round(self, tx_mbps: float = 5.0, drop_frac: float = 0.0, dt: float = 1.0):
+        """One full stats round: request, then a reply from every switch (publishes the snapshot)."""
+        self.start_stats_round()
+        for d in self.dps:
+            self.port_stats(d, tx_mbps, drop_frac, dt)
+
+    def port_stats(self, dpid: int, tx_mbps: float = 5.0, drop_frac: float = 0.0, dt: float = 1.0):
+        """Port-stats reply for every port of dpid with counters advanced by tx_mbps over dt.
+
+        The controller's previous sample of these ports is moved back to dt seconds ago, so the
+        rates it computes are tx_mbps regardless of how fast the caller loops.
+        """
+        dp = self.dps[dpid]
+        body = []
+        back = time.time() - dt
+        for sw, port in self.topo.net.edges:
+            if sw != dpid:
+                continue
+            c = self._port_ctr.setdefault((dpid, port), [0, 0, 0])
+            c[0] += int(tx_mbps * 1e6 * dt / 8)
+            c[1] += int(tx_mbps * 1e6 * dt / 8 / 1500)
+            c[2] = int(c[1] * drop_frac)
+            last = self.app._last_port.get((dpid, port))
+            if last is not None:
+                last["ts"] = back
+            body.append(ofproto_v1_3_parser.OFPPortStats(
+                port, 0, c[1], 0, c[0], 0, c[2], 0, 0, 0, 0, 0, 0, 0, 0))
+        msg = ofproto_v1_3_parser.OFPPortStatsReply(dp, body=body, flags=0)
+        self.app.port_stats_reply(ofp_event.EventOFPPortStatsReply(msg))
+
+    def rest(self, method: str, path: str, payload: Optional[dict] = None):
+        req = Request.blank(path, method=method)
+        if payload is not None:
+            req.body = json.dumps(payload).encode("utf-8")
+            req.content_type = "application/json"
+        resp = req.get_response(self.wsgi)
+        return resp.status_int, (json.loads(resp.body) if resp.body else None)
+
+    def propagate(self, limit: int = 10000) -> int:
+        """Re-inject PacketOuts sent on fabric ports as packet-ins at the peer; returns packet-ins caused."""
+        ofp = ofproto_v1_3
+        n = 0
+        while n < limit:
+            outs = [(d, m) for d, dp in self.dps.items() for m in dp.sent
+                    if isinstance(m, ofproto_v1_3_parser.OFPPacketOut)]
+            self.clear()
+            hops = []
+            for d, m in outs:
+                for a in m.actions:
+                    if not isinstance(a, ofproto_v1_3_parser.OFPActionOutput):
+                        continue
+                    ports = [a.port] if a.port != ofp.OFPP_FLOOD else \
+                        [p for (sw, p) in self.topo.net.edges if sw == d and p != m.in_port]
+                    hops.extend(self._peer[(d, p)] + (m.data,) for p in ports if (d, p) in self._peer)
+            if not hops:
+                break
+            for d, port, data in hops[:limit - n]:
+                self.packet_in(d, port, data)
+            n += min(len(hops), limit - n)
+        self.clear()
+        return n
+
+    # ---- accounting -----------------------------------------------------
+    def sent(self, kind=None):
+        msgs = [m for dp in self.dps.values() for m in dp.sent]
+        return msgs if kind is None else [m for m in msgs if isinstance(m, kind)]
+
+    def clear(self):
+        for dp in self.dps.values():
+            dp.clear()
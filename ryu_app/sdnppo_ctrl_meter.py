@@ -5,16 +5,40 @@ Ryu SDN Controller for PPO experiments (OpenFlow 1.3)
 
 Action u in [0,1]:
 - u sets the rate of an OpenFlow meter used to police elephant/shock UDP flows.
-- Routing is deterministic shortest-path (no action-driven routing changes).
+- u never changes routing; paths come from SDNPPO_ROUTING below.
+
+Routing (SDNPPO_ROUTING, independent of u):
+- sp          one BFS path per flow (default)
+- ecmp_hash   controller picks one of the equal-cost next hops per hop by 5-tuple hash
+- ecmp_group  flow entries on the whole equal-cost DAG, OFPGT_SELECT groups hash per flow in the switch
+
+Broadcast handling:
+- SDNPPO_PROXY_ARP=1 (default) answers ARP requests for known IPs from an IP->MAC table
+- SDNPPO_FLOOD=tree (default) floods along a BFS spanning tree cached per topology version;
+  SDNPPO_FLOOD=all restores OFPP_FLOOD PacketOuts (loops on leafspine/fattree/wan)
 
 REST:
 - GET  /sdnppo/state
 - POST /sdnppo/action {"u":0.5}
 - POST /sdnppo/reset
+- POST /sdnppo/hosts {"hosts":[{"mac":..,"ip":..,"dpid":..,"port":..}]}  (pre-seed host locations)
+- GET  /sdnppo/topology
+- GET  /sdnppo/balance   (per-ECMP-set and fabric-wide load balance)
+- GET  /sdnppo/counters  (packet-ins, flood PacketOuts, proxied ARP replies, pending-install hits)
+- GET  /sdnppo/links     (link index + per-link util/drop as JSON)
+- GET  /sdnppo/links.bin (same vectors as float32; layout in sdnppo_mn/linkstate.py)
+
+SDNPPO_STATE_SHM=/dev/shm/sdnppo_state additionally publishes state + links.bin to a
+lock-free shared-memory snapshot after every completed stats round / action / reset; ryu_app/state_server.py
+serves the GETs from it in a separate process, so they never queue behind OpenFlow events.
 """
 
 import json
+import struct
+import sys
 import time
+import zlib
+from array import array
 from collections import defaultdict, deque
 from typing import Dict, List, Optional, Tuple
 
@@ -24,15 +48,25 @@ from ryu.controller.handler import MAIN_DISPATCHER, CONFIG_DISPATCHER, DEAD_DISP
 from ryu.controller.handler import set_ev_cls
 from ryu.ofproto import ofproto_v1_3
 from ryu.lib import hub
-from ryu.lib.packet import packet, ethernet, ipv4, udp, tcp
+from ryu.lib.packet import packet, ethernet, arp, ipv4, udp, tcp
 from ryu.topology import event
 from ryu.topology.api import get_switch, get_link
 
-from ryu.app.wsgi import WSGIApplication, ControllerBase, route
-from webob import Response
+# ryu's Response defaults charset to UTF-8; plain webob refuses str bodies for application/json.
+from ryu.app.wsgi import WSGIApplication, ControllerBase, Response, route
+
+try:
+    from .state_shm import SnapshotWriter
+except ImportError:  # loaded by file path from ryu-manager
+    from state_shm import SnapshotWriter
 
 REST_APP_NAME = "sdnppo_rest"
 
+# /sdnppo/links.bin header; keep in sync with sdnppo_mn/linkstate.py (ryu-manager loads this file standalone).
+LINKS_HEADER = struct.Struct("<4sHHIId")
+LINKS_MAGIC = b"SDNL"
+LINKS_VERSION = 1
+
 MICE_PORTS = {5201, 5202}
 ELE_PORTS  = {5203}
 SHOCK_PORTS= {5204}
@@ -41,6 +75,21 @@ METERED_PORTS = ELE_PORTS | SHOCK_PORTS
 def clamp(x: float, lo: float, hi: float) -> float:
     return max(lo, min(hi, x))
 
+def fmix32(x: int) -> int:
+    """murmur3 finalizer; decorrelates the per-hop choices (CRC alone is linear in the salt)."""
+    x &= 0xFFFFFFFF
+    x ^= x >> 16
+    x = (x * 0x85EBCA6B) & 0xFFFFFFFF
+    x ^= x >> 13
+    x = (x * 0xC2B2AE35) & 0xFFFFFFFF
+    return x ^ (x >> 16)
+
+def jain(xs) -> float:
+    """Jain's fairness index of xs (1.0 = perfectly balanced)."""
+    xs = list(xs)
+    sq = sum(x * x for x in xs)
+    return (sum(xs) ** 2) / (len(xs) * sq) if xs and sq > 0 else 1.0
+
 class Rest(ControllerBase):
     def __init__(self, req, link, data, **config):
         super().__init__(req, link, data, **config)
@@ -68,6 +117,40 @@ class Rest(ControllerBase):
         body = json.dumps({"ok": True})
         return Response(content_type="application/json", body=body)
 
+    @route("sdnppo", "/sdnppo/hosts", methods=["POST"])
+    def set_hosts(self, req, **kwargs):
+        try:
+            payload = req.json if req.body else {}
+        except Exception:
+            payload = {}
+        n = self.app.learn_hosts(payload.get("hosts", []))
+        body = json.dumps({"ok": True, "learned": n, **self.app.get_topology()})
+        return Response(content_type="application/json", body=body)
+
+    @route("sdnppo", "/sdnppo/topology", methods=["GET"])
+    def get_topology(self, req, **kwargs):
+        body = json.dumps(self.app.get_topology())
+        return Response(content_type="application/json", body=body)
+
+    @route("sdnppo", "/sdnppo/balance", methods=["GET"])
+    def get_balance(self, req, **kwargs):
+        body = json.dumps(self.app.get_balance())
+        return Response(content_type="application/json", body=body)
+
+    @route("sdnppo", "/sdnppo/links", methods=["GET"])
+    def get_links(self, req, **kwargs):
+        body = json.dumps(self.app.get_links())
+        return Response(content_type="application/json", body=body)
+
+    @route("sdnppo", "/sdnppo/links.bin", methods=["GET"])
+    def get_links_bin(self, req, **kwargs):
+        return Response(content_type="application/octet-stream", body=self.app.links_bin())
+
+    @route("sdnppo", "/sdnppo/counters", methods=["GET"])
+    def get_counters(self, req, **kwargs):
+        body = json.dumps(self.app.get_counters())
+        return Response(content_type="application/json", body=body)
+
 class SdnPpoController(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
     _CONTEXTS = {"wsgi": WSGIApplication}
@@ -87,10 +170,39 @@ class SdnPpoController(app_manager.RyuApp):
         self.meter_id = 1
         self.meter_kbps = self.u_to_kbps(self.u)
 
+        self.routing = self.env("SDNPPO_ROUTING", "sp")
+        if self.routing not in ("sp", "ecmp_hash", "ecmp_group"):
+            raise ValueError(f"SDNPPO_ROUTING must be sp|ecmp_hash|ecmp_group, got {self.routing!r}")
+        self.proxy_arp = self.env("SDNPPO_PROXY_ARP", "1") == "1"
+        self.flood_mode = self.env("SDNPPO_FLOOD", "tree")
+        if self.flood_mode not in ("tree", "all"):
+            raise ValueError(f"SDNPPO_FLOOD must be tree|all, got {self.flood_mode!r}")
+        # Packet-ins of a flow within this window after its install are forwarded without new FlowMods.
+        self.pending_ttl_s = float(self.env("SDNPPO_PENDING_TTL_S", "1.0"))
+        self._pending: Dict[tuple, Tuple[float, tuple]] = {}
+
         self.datapaths: Dict[int, object] = {}
         self.adj = defaultdict(set)
         self.port_map = defaultdict(dict)
         self.host_loc: Dict[str, Tuple[int, int]] = {}
+        self.ip_mac: Dict[str, str] = {}
+        self.sw_ports: Dict[int, List[int]] = {}
+        self.topo_version = 0
+        self._tree: Tuple[int, Dict[int, set]] = (-1, {})
+        self._dist_cache: Dict[int, Dict[int, int]] = {}
+        self._radj: Optional[Dict[int, set]] = None
+        self._groups: Dict[Tuple[int, int], Tuple[int, Tuple[int, ...]]] = {}
+        self._group_ctr = defaultdict(int)
+        self._ecmp_sets = set()
+        self.path_flows = defaultdict(lambda: defaultdict(int))
+        self.port_tx_mbps: Dict[Tuple[int, int], float] = {}
+        self.port_drop: Dict[Tuple[int, int], float] = {}
+        self._links: Tuple[int, List[Tuple[int, int, int]]] = (-1, [])
+        # links.bin body (util[n] + drop[n], float32), updated in place by port_stats_reply
+        self._link_pos: Dict[Tuple[int, int], int] = {}
+        self._link_buf = array("f")
+        self._stats_waiting: set = set()
+        self.counters = self.zero_counters()
 
         self._meter_installed = set()
         self._last_port = {}
@@ -108,6 +220,12 @@ class SdnPpoController(app_manager.RyuApp):
             "active_flows": 0,
         }
 
+        self.shm = None
+        shm_path = self.env("SDNPPO_STATE_SHM", "")
+        if shm_path:
+            self.shm = SnapshotWriter(shm_path, int(self.env("SDNPPO_STATE_SHM_KB", "1024")) * 1024)
+            self.publish_state()
+
         self._stats_thread = hub.spawn(self.stats_loop)
         self._cleanup_thread = hub.spawn(self.cleanup_loop)
 
@@ -126,10 +244,18 @@ class SdnPpoController(app_manager.RyuApp):
         self.latest["meter_kbps"] = self.meter_kbps
         for dp in list(self.datapaths.values()):
             self.ensure_meter(dp, force_modify=True)
+        self.publish_state()
 
     def reset_metrics(self):
         self._last_port = {}
         self.flow_last_seen = {}
+        self.port_tx_mbps = {}
+        self.port_drop = {}
+        self._links = (-1, [])
+        self._stats_waiting = set()
+        self._pending.clear()
+        self.path_flows.clear()
+        self.counters = self.zero_counters()
         self.latest.update({
             "ts": time.time(),
             "u": self.u,
@@ -140,12 +266,119 @@ class SdnPpoController(app_manager.RyuApp):
             "throughput_mbps": 0.0,
             "active_flows": 0,
         })
+        self.publish_state()
 
     def get_state(self):
         d = dict(self.latest)
         d["ts"] = time.time()
         return d
 
+    def publish_state(self):
+        """Push the current state and link vectors to the shared-memory snapshot (if enabled)."""
+        if self.shm is None:
+            return
+        d = dict(self.latest)
+        d["published_ts"] = time.time()
+        if not self.shm.publish(json.dumps(d).encode("utf-8"), self.links_bin()):
+            self.logger.warning("state snapshot larger than SDNPPO_STATE_SHM_KB; not published")
+
+    def get_topology(self):
+        return {
+            "switches": len(self.adj),
+            "links": sum(len(v) for v in self.adj.values()),
+            "datapaths": len(self.datapaths),
+            "hosts": len(self.host_loc),
+        }
+
+    def learn_hosts(self, hosts) -> int:
+        """Pre-seed host_loc (and ip_mac) from known MAC/port bindings so no broadcast warm-up is needed."""
+        n = 0
+        for h in hosts:
+            try:
+                self.host_loc[str(h["mac"])] = (int(h["dpid"]), int(h["port"]))
+                n += 1
+            except (KeyError, TypeError, ValueError):
+                continue
+            if h.get("ip"):
+                self.ip_mac[str(h["ip"])] = str(h["mac"])
+        return n
+
+    @staticmethod
+    def zero_counters() -> Dict[str, int]:
+        return {
+            "packet_in": 0,
+            "arp_in": 0,
+            "arp_proxied": 0,
+            "arp_unicast": 0,
+            "flood_events": 0,
+            "flood_pktout": 0,
+            "flood_dropped": 0,
+            "flow_installs": 0,
+            "pending_hits": 0,
+        }
+
+    def get_counters(self):
+        d = dict(self.counters)
+        d.update({"proxy_arp": self.proxy_arp, "flood": self.flood_mode,
+                  "known_ips": len(self.ip_mac), "topo_version": self.topo_version})
+        return d
+
+    def get_balance(self):
+        sets = []
+        for sw, dst in sorted(self._ecmp_sets):
+            ports = [self.port_map.get(sw, {}).get(v) for v in self.ecmp_next_hops(sw, dst)]
+            rates = {p: self.port_tx_mbps.get((sw, p), 0.0) for p in ports if p is not None}
+            sets.append({"dpid": sw, "dst": dst, "tx_mbps": {str(p): r for p, r in rates.items()},
+                         "jain": jain(rates.values())})
+        fabric = [self.port_tx_mbps.get((s, p), 0.0) for s, nbrs in self.port_map.items() for p in nbrs.values()]
+        paths = []
+        for (src, dst), cnt in sorted(self.path_flows.items()):
+            paths.append({"src": src, "dst": dst, "jain": jain(cnt.values()),
+                          "paths": [{"path": list(p), "flows": n} for p, n in sorted(cnt.items())]})
+        return {
+            "routing": self.routing,
+            "topo_version": self.topo_version,
+            "fabric_jain": jain(fabric),
+            "fabric_max_mbps": max(fabric) if fabric else 0.0,
+            "ecmp_sets": sets,
+            # ecmp_group: the switches pick a bucket per flow, the controller never learns the path taken
+            "path_flows": None if self.routing == "ecmp_group" else paths,
+        }
+
+    def link_index(self) -> List[Tuple[int, int, int]]:
+        """Switch-to-switch links as (src_dpid, src_port, dst_dpid), sorted; stable per topology version."""
+        version, links = self._links
+        if version != self.topo_version:
+            links = sorted((s, p, d) for s, nbrs in self.port_map.items() for d, p in nbrs.items())
+            self._links = (self.topo_version, links)
+            self._link_pos = {(s, p): i for i, (s, p, _) in enumerate(links)}
+            self._link_buf = array("f", [self.port_tx_mbps.get((s, p), 0.0) / self.link_cap_mbps for s, p, _ in links]
+                                   + [self.port_drop.get((s, p), 0.0) for s, p, _ in links])
+        return links
+
+    def link_vectors(self):
+        links = self.link_index()
+        cap = self.link_cap_mbps
+        util = [self.port_tx_mbps.get((s, p), 0.0) / cap for s, p, _ in links]
+        drop = [self.port_drop.get((s, p), 0.0) for s, p, _ in links]
+        return links, util, drop
+
+    def get_links(self):
+        links, util, drop = self.link_vectors()
+        return {"topo_version": self.topo_version, "ts": time.time(),
+                "links": [list(x) for x in links], "util": util, "drop": drop}
+
+    def links_bin(self) -> bytes:
+        links = self.link_index()
+        body = self._link_buf
+        if sys.byteorder != "little":
+            body = array("f", body)
+            body.byteswap()
+        return LINKS_HEADER.pack(LINKS_MAGIC, LINKS_VERSION, 2, len(links), self.topo_version, time.time()) + body.tobytes()
+
+    def is_edge_port(self, dpid: int, port_no: int) -> bool:
+        return port_no not in self.port_map.get(dpid, {}).values()
+
     @set_ev_cls(event.EventSwitchEnter)
     def on_switch_enter(self, ev):
         self.rebuild_topology()
@@ -155,17 +388,24 @@ class SdnPpoController(app_manager.RyuApp):
         self.rebuild_topology()
 
     def rebuild_topology(self):
-        switch_list = get_switch(self, None)
-        link_list = get_link(self, None)
+        self.load_topology(get_switch(self, None), get_link(self, None))
+
+    def load_topology(self, switch_list, link_list):
         self.adj.clear()
         self.port_map.clear()
+        self.sw_ports = {}
         for sw in switch_list:
             self.adj[sw.dp.id]
+            self.sw_ports[sw.dp.id] = sorted(p.port_no for p in sw.ports)
         for lk in link_list:
             s = lk.src.dpid
             d = lk.dst.dpid
             self.adj[s].add(d)
             self.port_map[s][d] = lk.src.port_no
+        self.topo_version += 1
+        self._dist_cache.clear()
+        self._radj = None
+        self._pending.clear()
         self.logger.info("Topology updated: switches=%d links=%d", len(switch_list), len(link_list))
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
@@ -190,6 +430,8 @@ class SdnPpoController(app_manager.RyuApp):
         elif ev.state == DEAD_DISPATCHER:
             self.datapaths.pop(dp.id, None)
             self._meter_installed.discard(dp.id)
+            for key in [k for k in self._groups if k[0] == dp.id]:
+                self._groups.pop(key, None)
 
     def ensure_meter(self, dp, force_modify: bool):
         ofp = dp.ofproto
@@ -216,51 +458,87 @@ class SdnPpoController(app_manager.RyuApp):
 
         pkt = packet.Packet(msg.data)
         eth = pkt.get_protocol(ethernet.ethernet)
-        if eth.ethertype == 0x88cc:
-            return
-        if eth is None:
+        if eth is None or eth.ethertype == 0x88cc:
             return
+        self.counters["packet_in"] += 1
         src = eth.src
         dst = eth.dst
-        self.host_loc[src] = (dp.id, in_port)
+        ip4 = pkt.get_protocol(ipv4.ipv4)
+        # Only learn on host-facing ports; flooded copies arriving over fabric links
+        # would otherwise move (pre-seeded) hosts onto transit switches.
+        if self.is_edge_port(dp.id, in_port):
+            self.host_loc[src] = (dp.id, in_port)
+            if ip4 is not None:
+                self.ip_mac[ip4.src] = src
 
         if eth.ethertype == 0x0806:
-            self.flood(dp, msg)
+            self.handle_arp(dp, msg, in_port, eth, pkt.get_protocol(arp.arp))
             return
 
-        ip4 = pkt.get_protocol(ipv4.ipv4)
         if ip4 is None:
             self.flood(dp, msg)
             return
-        if dst not in self.host_loc:
+        if dst not in self.host_loc or src not in self.host_loc:
             self.flood(dp, msg)
             return
 
         src_sw, _ = self.host_loc[src]
         dst_sw, dst_port = self.host_loc[dst]
 
-        path = self.shortest_path(src_sw, dst_sw)
-        if not path:
+        fields, metered = self.flow_fields(ip4, pkt)
+        key = tuple(fields.values())
+        now = time.time()
+        pending = self._pending.get(key)
+        if pending is not None and pending[0] > now:
+            # FlowMods for this flow are already on their way: forward only, no reinstall.
+            self.counters["pending_hits"] += 1
+            self.forward(dp, msg, in_port, pending[1])
+            return
+
+        if self.routing == "ecmp_group":
+            route = (None, self.ecmp_dag(src_sw, dst_sw), dst_sw, dst_port)
+        else:
+            route = (self.route_path(src_sw, dst_sw, key), None, dst_sw, dst_port)
+        if not (route[0] or route[1]):
             self.flood(dp, msg)
             return
 
-        match, metered = self.flow_match(parser, ip4, pkt)
+        match = parser.OFPMatch(**fields)
         if metered:
             src_dp = self.datapaths.get(src_sw)
             if src_dp is not None:
                 self.ensure_meter(src_dp, force_modify=False)
 
-        self.install_path(path, match, dst_port, metered_src_switch=src_sw if metered else None)
-
-        out_port = self.next_hop_out_port(path, dp.id, dst_port)
-        if out_port is None:
+        metered_sw = src_sw if metered else None
+        if route[0] is None:
+            self.install_dag(route[1], dst_sw, match, dst_port, metered_src_switch=metered_sw)
+        else:
+            self.install_path(route[0], match, dst_port, metered_src_switch=metered_sw)
+        self.counters["flow_installs"] += 1
+        if self.pending_ttl_s > 0:
+            if len(self._pending) >= 4096:
+                self.expire_pending(now)
+            self._pending[key] = (now + self.pending_ttl_s, route)
+        self.forward(dp, msg, in_port, route)
+
+    def forward(self, dp, msg, in_port: int, route):
+        """PacketOut at dp along route = (path, ecmp dag, dst_sw, dst_port); floods if dp is not on it."""
+        path, dag, dst_sw, dst_port = route
+        if path is None:
+            actions = self.ecmp_actions(dp, dst_sw, dag[dp.id], dst_port) if dp.id in dag else None
+        else:
+            out_port = self.next_hop_out_port(path, dp.id, dst_port)
+            actions = [dp.ofproto_parser.OFPActionOutput(out_port)] if out_port is not None else None
+        if actions is None:
             self.flood(dp, msg)
             return
-        actions = [parser.OFPActionOutput(out_port)]
-        data = None if msg.buffer_id != ofp.OFP_NO_BUFFER else msg.data
-        dp.send_msg(parser.OFPPacketOut(datapath=dp, buffer_id=msg.buffer_id, in_port=in_port, actions=actions, data=data))
+        self.packet_out(dp, in_port, actions, msg.data, buffer_id=msg.buffer_id)
+
+    def expire_pending(self, now: float):
+        for k in [k for k, (exp, _) in self._pending.items() if exp <= now]:
+            self._pending.pop(k, None)
 
-    def flow_match(self, parser, ip4, pkt):
+    def flow_fields(self, ip4, pkt):
         ip_proto = ip4.proto
         m = {"eth_type": 0x0800, "ipv4_src": ip4.src, "ipv4_dst": ip4.dst, "ip_proto": ip_proto}
         metered = False
@@ -276,15 +554,105 @@ class SdnPpoController(app_manager.RyuApp):
             if t:
                 m["tcp_src"] = int(t.src_port)
                 m["tcp_dst"] = int(t.dst_port)
-        return parser.OFPMatch(**m), metered
+        return m, metered
 
-    def flood(self, dp, msg):
+    def handle_arp(self, dp, msg, in_port: int, eth, a):
+        self.counters["arp_in"] += 1
+        if a is None:
+            self.flood(dp, msg)
+            return
+        if self.is_edge_port(dp.id, in_port):
+            self.host_loc[a.src_mac] = (dp.id, in_port)
+            # DAD probes carry no sender address
+            if a.src_ip != "0.0.0.0":
+                self.ip_mac[a.src_ip] = a.src_mac
+
+        # Gratuitous ARP / a host asking for its own address is an announcement: flood it, never answer it.
+        if (self.proxy_arp and a.opcode == arp.ARP_REQUEST and a.dst_ip in self.ip_mac
+                and a.src_ip != a.dst_ip and self.ip_mac[a.dst_ip] != a.src_mac):
+            self.arp_reply(dp, in_port, a, self.ip_mac[a.dst_ip])
+            self.counters["arp_proxied"] += 1
+            return
+        # Unicast ARP (replies, refreshes) goes straight out of the target's host port.
+        if self.proxy_arp and eth.dst in self.host_loc:
+            dst_sw, dst_port = self.host_loc[eth.dst]
+            dst_dp = self.datapaths.get(dst_sw)
+            if dst_dp is not None:
+                self.packet_out(dst_dp, dst_dp.ofproto.OFPP_CONTROLLER, [dst_dp.ofproto_parser.OFPActionOutput(dst_port)], msg.data)
+                self.counters["arp_unicast"] += 1
+                return
+        self.flood(dp, msg)
+
+    def arp_reply(self, dp, in_port: int, req, mac: str):
+        pkt = packet.Packet()
+        pkt.add_protocol(ethernet.ethernet(dst=req.src_mac, src=mac, ethertype=0x0806))
+        pkt.add_protocol(arp.arp(opcode=arp.ARP_REPLY, src_mac=mac, src_ip=req.dst_ip,
+                                 dst_mac=req.src_mac, dst_ip=req.src_ip))
+        pkt.serialize()
+        self.packet_out(dp, dp.ofproto.OFPP_CONTROLLER, [dp.ofproto_parser.OFPActionOutput(in_port)], pkt.data)
+
+    def packet_out(self, dp, in_port: int, actions, data, buffer_id: Optional[int] = None):
         ofp = dp.ofproto
         parser = dp.ofproto_parser
-        actions = [parser.OFPActionOutput(ofp.OFPP_FLOOD)]
-        dp.send_msg(parser.OFPPacketOut(datapath=dp, buffer_id=msg.buffer_id,
-                                       in_port=msg.match["in_port"], actions=actions,
-                                       data=None if msg.buffer_id != ofp.OFP_NO_BUFFER else msg.data))
+        if buffer_id is None or buffer_id == ofp.OFP_NO_BUFFER:
+            buffer_id, payload = ofp.OFP_NO_BUFFER, data
+        else:
+            payload = None
+        dp.send_msg(parser.OFPPacketOut(datapath=dp, buffer_id=buffer_id, in_port=in_port,
+                                        actions=actions, data=payload))
+
+    def flood(self, dp, msg):
+        parser = dp.ofproto_parser
+        in_port = msg.match["in_port"]
+        self.counters["flood_events"] += 1
+        ports = self.flood_ports(dp.id)
+        if ports is None:
+            actions = [parser.OFPActionOutput(dp.ofproto.OFPP_FLOOD)]
+        elif in_port not in ports and not self.is_edge_port(dp.id, in_port):
+            # Arrived over a non-tree fabric link: some other copy already covers this switch.
+            self.counters["flood_dropped"] += 1
+            return
+        else:
+            actions = [parser.OFPActionOutput(p) for p in sorted(ports) if p != in_port]
+            if not actions:
+                return
+        self.counters["flood_pktout"] += 1
+        self.packet_out(dp, in_port, actions, msg.data, buffer_id=msg.buffer_id)
+
+    def flood_ports(self, dpid: int) -> Optional[set]:
+        """Host ports + spanning-tree fabric ports of dpid, or None for a plain OFPP_FLOOD."""
+        if self.flood_mode != "tree" or dpid not in self.sw_ports:
+            return None
+        version, ports = self._tree
+        if version != self.topo_version:
+            ports = self.spanning_tree_ports()
+            self._tree = (self.topo_version, ports)
+        return ports.get(dpid)
+
+    def spanning_tree_ports(self) -> Dict[int, set]:
+        """BFS tree from the lowest dpid in each component; both ends of every tree link plus all host ports."""
+        fabric = {d: set(nbrs.values()) for d, nbrs in self.port_map.items()}
+        ports = {d: set(p for p in self.sw_ports[d] if p not in fabric.get(d, ())) for d in self.sw_ports}
+        seen = set()
+        for root in sorted(self.sw_ports):
+            if root in seen:
+                continue
+            seen.add(root)
+            q = deque([root])
+            while q:
+                u = q.popleft()
+                for v in sorted(self.adj.get(u, [])):
+                    if v in seen or v not in ports:
+                        continue
+                    pu = self.port_map.get(u, {}).get(v)
+                    pv = self.port_map.get(v, {}).get(u)
+                    if pu is None or pv is None:
+                        continue
+                    seen.add(v)
+                    ports[u].add(pu)
+                    ports[v].add(pv)
+                    q.append(v)
+        return ports
 
     def install_path(self, path: List[int], match, dst_port: int, metered_src_switch: Optional[int]):
         for idx, sw in enumerate(path):
@@ -292,7 +660,6 @@ class SdnPpoController(app_manager.RyuApp):
             if dp is None:
                 continue
             parser = dp.ofproto_parser
-            ofp = dp.ofproto
 
             if sw == path[-1]:
                 out_port = dst_port
@@ -301,19 +668,68 @@ class SdnPpoController(app_manager.RyuApp):
                 out_port = self.port_map.get(sw, {}).get(nxt)
             if out_port is None:
                 continue
+            self.install_flow(dp, match, [parser.OFPActionOutput(out_port)],
+                              metered=metered_src_switch is not None and sw == metered_src_switch)
+
+    def install_dag(self, dag: Dict[int, List[int]], dst_sw: int, match, dst_port: int,
+                    metered_src_switch: Optional[int]):
+        """Install the flow on every switch of the equal-cost DAG (select groups where it fans out)."""
+        for sw, nxt in dag.items():
+            dp = self.datapaths.get(sw)
+            if dp is None:
+                continue
+            actions = self.ecmp_actions(dp, dst_sw, nxt, dst_port)
+            if actions is None:
+                continue
+            self.install_flow(dp, match, actions,
+                              metered=metered_src_switch is not None and sw == metered_src_switch)
+
+    def install_flow(self, dp, match, actions, metered: bool):
+        parser = dp.ofproto_parser
+        ofp = dp.ofproto
+        inst = []
+        if metered:
+            inst.append(parser.OFPInstructionMeter(self.meter_id))
+        inst.append(parser.OFPInstructionActions(ofp.OFPIT_APPLY_ACTIONS, actions))
 
-            actions = [parser.OFPActionOutput(out_port)]
-            inst = []
-            if metered_src_switch is not None and sw == metered_src_switch:
-                inst.append(parser.OFPInstructionMeter(self.meter_id))
-            inst.append(parser.OFPInstructionActions(ofp.OFPIT_APPLY_ACTIONS, actions))
+        cookie = self.cookie_ctr
+        self.cookie_ctr += 1
+        self.flow_last_seen[cookie] = time.time()
 
-            cookie = self.cookie_ctr
-            self.cookie_ctr += 1
-            self.flow_last_seen[cookie] = time.time()
+        dp.send_msg(parser.OFPFlowMod(datapath=dp, cookie=cookie, priority=100, match=match,
+                                      instructions=inst, idle_timeout=60, hard_timeout=0))
 
-            dp.send_msg(parser.OFPFlowMod(datapath=dp, cookie=cookie, priority=100, match=match,
-                                          instructions=inst, idle_timeout=60, hard_timeout=0))
+    def ecmp_actions(self, dp, dst_sw: int, nxt: List[int], dst_port: int):
+        parser = dp.ofproto_parser
+        if not nxt:
+            # dst_port is a port of dst_sw only; a dead end elsewhere is left to the packet-in path
+            return [parser.OFPActionOutput(dst_port)] if dp.id == dst_sw else None
+        ports = sorted(p for p in (self.port_map.get(dp.id, {}).get(v) for v in nxt) if p is not None)
+        if not ports:
+            return None
+        if len(ports) == 1:
+            return [parser.OFPActionOutput(ports[0])]
+        self._ecmp_sets.add((dp.id, dst_sw))
+        return [parser.OFPActionGroup(self.ensure_select_group(dp, dst_sw, ports))]
+
+    def ensure_select_group(self, dp, dst_sw: int, ports: List[int]) -> int:
+        """One OFPGT_SELECT group per (switch, destination switch); re-sent only when its ports change."""
+        key = (dp.id, dst_sw)
+        cur = self._groups.get(key)
+        if cur is not None and cur[1] == tuple(ports):
+            return cur[0]
+        ofp = dp.ofproto
+        parser = dp.ofproto_parser
+        if cur is None:
+            self._group_ctr[dp.id] += 1
+            gid, cmd = self._group_ctr[dp.id], ofp.OFPGC_ADD
+        else:
+            gid, cmd = cur[0], ofp.OFPGC_MODIFY
+        buckets = [parser.OFPBucket(weight=1, watch_port=ofp.OFPP_ANY, watch_group=ofp.OFPG_ANY,
+                                    actions=[parser.OFPActionOutput(p)]) for p in ports]
+        dp.send_msg(parser.OFPGroupMod(dp, cmd, ofp.OFPGT_SELECT, gid, buckets))
+        self._groups[key] = (gid, tuple(ports))
+        return gid
 
     def next_hop_out_port(self, path: List[int], current_sw: int, dst_port: int) -> Optional[int]:
         if current_sw not in path:
@@ -324,6 +740,71 @@ class SdnPpoController(app_manager.RyuApp):
         nxt = path[i + 1]
         return self.port_map.get(current_sw, {}).get(nxt)
 
+    def route_path(self, src: int, dst: int, flow_key) -> List[int]:
+        path = self.ecmp_hash_path(src, dst, flow_key) if self.routing == "ecmp_hash" else None
+        if path is None:
+            path = self.shortest_path(src, dst)
+        if path:
+            self.path_flows[(src, dst)][tuple(path)] += 1
+        return path
+
+    def dist_to(self, dst: int) -> Dict[int, int]:
+        """BFS hop counts towards dst over the links as discovered (one direction may still be missing), cached."""
+        d = self._dist_cache.get(dst)
+        if d is None:
+            if self._radj is None:
+                self._radj = defaultdict(set)
+                for u, nbrs in self.adj.items():
+                    for v in nbrs:
+                        self._radj[v].add(u)
+            d = {dst: 0}
+            q = deque([dst])
+            while q:
+                u = q.popleft()
+                for v in self._radj.get(u, ()):
+                    if v not in d:
+                        d[v] = d[u] + 1
+                        q.append(v)
+            self._dist_cache[dst] = d
+        return d
+
+    def ecmp_next_hops(self, sw: int, dst: int) -> List[int]:
+        d = self.dist_to(dst)
+        if sw not in d or sw == dst:
+            return []
+        return sorted(v for v in self.adj.get(sw, []) if d.get(v, -1) == d[sw] - 1)
+
+    def ecmp_hash_path(self, src: int, dst: int, flow_key) -> Optional[List[int]]:
+        """Walk the equal-cost DAG choosing each next hop by a hash of the 5-tuple (salted per hop); None on a dead end."""
+        if src not in self.dist_to(dst):
+            return None
+        h = zlib.crc32(repr(flow_key).encode("utf-8"))
+        path = [src]
+        sw = src
+        while sw != dst:
+            nxt = self.ecmp_next_hops(sw, dst)
+            if not nxt:
+                return None
+            if len(nxt) > 1:
+                self._ecmp_sets.add((sw, dst))
+            sw = nxt[fmix32(h ^ (sw * 0x9E3779B1)) % len(nxt)]
+            path.append(sw)
+        return path
+
+    def ecmp_dag(self, src: int, dst: int) -> Dict[int, List[int]]:
+        """Switches reachable from src on some shortest path to dst -> their equal-cost next hops."""
+        if src not in self.dist_to(dst):
+            return {}
+        dag = {}
+        q = deque([src])
+        while q:
+            sw = q.popleft()
+            if sw in dag:
+                continue
+            dag[sw] = self.ecmp_next_hops(sw, dst)
+            q.extend(v for v in dag[sw] if v not in dag)
+        return dag
+
     def shortest_path(self, src: int, dst: int) -> List[int]:
         if src == dst:
             return [src]
@@ -348,8 +829,7 @@ class SdnPpoController(app_manager.RyuApp):
     def stats_loop(self):
         while True:
             try:
-                for dp in list(self.datapaths.values()):
-                    self.request_port_stats(dp)
+                self.request_stats_round()
             except Exception as e:
                 self.logger.warning("stats_loop error: %s", e)
             hub.sleep(self.stats_interval_s)
@@ -361,8 +841,18 @@ class SdnPpoController(app_manager.RyuApp):
             for c in expired:
                 self.flow_last_seen.pop(c, None)
             self.latest["active_flows"] = len(self.flow_last_seen)
+            self.expire_pending(now)
             hub.sleep(5.0)
 
+    def request_stats_round(self):
+        """Ask every switch for port stats; the snapshot is published once the last one has replied."""
+        if self._stats_waiting:
+            # a switch did not answer the previous round in time: publish what did arrive
+            self.publish_state()
+        self._stats_waiting = set(self.datapaths)
+        for dp in list(self.datapaths.values()):
+            self.request_port_stats(dp)
+
     def request_port_stats(self, dp):
         parser = dp.ofproto_parser
         dp.send_msg(parser.OFPPortStatsRequest(dp, 0, dp.ofproto.OFPP_ANY))
@@ -374,6 +864,8 @@ class SdnPpoController(app_manager.RyuApp):
         now = time.time()
 
         cap_bps = self.link_cap_mbps * 1e6
+        self.link_index()
+        n_links = len(self._link_pos)
         utils = []
         total_tx_bytes = 0
         total_tx_pkts = 0
@@ -397,6 +889,12 @@ class SdnPpoController(app_manager.RyuApp):
                 ddrop = max(0, tx_drop - prev["tx_drop"])
 
                 utils.append((dbytes * 8.0 / dt) / cap_bps)
+                self.port_tx_mbps[key] = dbytes * 8.0 / dt / 1e6
+                self.port_drop[key] = ddrop / (dpkts + ddrop) if dpkts + ddrop > 0 else 0.0
+                i = self._link_pos.get(key)
+                if i is not None:
+                    self._link_buf[i] = self.port_tx_mbps[key] / self.link_cap_mbps
+                    self._link_buf[n_links + i] = self.port_drop[key]
                 total_tx_bytes += dbytes
                 total_tx_pkts += dpkts
                 total_tx_drop += ddrop
@@ -416,3 +914,7 @@ class SdnPpoController(app_manager.RyuApp):
         self.latest["u"] = self.u
         self.latest["meter_kbps"] = self.meter_kbps
         self.latest["ts"] = now
+        if dp.id in self._stats_waiting:
+            self._stats_waiting.discard(dp.id)
+            if not self._stats_waiting:
+                self.publish_state()
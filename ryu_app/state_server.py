@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+REST front end that serves controller state from the shared-memory snapshot.
+
+GET /sdnppo/state and /sdnppo/links.bin are answered from the snapshot the
+controller publishes (SDNPPO_STATE_SHM), in this process, so they never wait
+behind packet-ins or stats replies on the Ryu hub. Everything else (POST
+/sdnppo/action, /sdnppo/reset, /sdnppo/hosts, other GETs) is proxied to the
+controller's own REST API. GET /sdnppo/snapshot reports seq, age and reader retries.
+
+Usage (stdlib only; start after the controller has created the snapshot):
+  SDNPPO_STATE_SHM=/dev/shm/sdnppo_state ./scripts/01_run_ryu.sh
+  python3 -m ryu_app.state_server --shm /dev/shm/sdnppo_state --port 8081 --upstream http://127.0.0.1:8080
+  ... then point clients at --rest_port 8081
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from .state_shm import SnapshotReader
+
+def make_handler(reader: SnapshotReader, upstream: str, timeout_s: float = 2.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *a):
+            pass
+
+        def _send(self, code: int, body: bytes, content_type: str):
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _proxy(self, method: str, body=None):
+            headers = {"Content-Type": self.headers.get("Content-Type", "application/json")} if body else {}
+            req = Request(upstream + self.path, data=body, method=method, headers=headers)
+            try:
+                with urlopen(req, timeout=timeout_s) as r:
+                    return self._send(r.status, r.read(), r.headers.get("Content-Type", "application/json"))
+            except HTTPError as e:
+                return self._send(e.code, e.read(), "text/plain")
+            except OSError as e:
+                return self._send(502, str(e).encode("utf-8"), "text/plain")
+
+        def do_GET(self):
+            if self.path == "/sdnppo/snapshot":
+                snap = reader.read()
+                st = json.loads(snap[1]) if snap else {}
+                body = {"seq": reader.seq(), "retries": reader.retries,
+                        "age_s": time.time() - st["published_ts"] if "published_ts" in st else None}
+                return self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+            if self.path in ("/sdnppo/state", "/sdnppo/links.bin"):
+                snap = reader.read()
+                if snap is not None:
+                    _, state, links = snap
+                    if self.path == "/sdnppo/links.bin":
+                        return self._send(200, links, "application/octet-stream")
+                    d = json.loads(state)
+                    d["ts"] = time.time()
+                    return self._send(200, json.dumps(d).encode("utf-8"), "application/json")
+            return self._proxy("GET")
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return self._proxy("POST", self.rfile.read(n) if n else b"{}")
+
+    return Handler
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--shm", default="/dev/shm/sdnppo_state")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8081)
+    ap.add_argument("--upstream", default="http://127.0.0.1:8080", help="controller REST API for everything else")
+    args = ap.parse_args()
+
+    reader = SnapshotReader(args.shm)
+    srv = ThreadingHTTPServer((args.host, args.port), make_handler(reader, args.upstream.rstrip("/")))
+    print(f"[state_server] {args.shm} on http://{args.host}:{args.port} (proxy -> {args.upstream})")
+    try:
+        srv.serve_forever()
+    finally:
+        srv.server_close()
+
+if __name__ == "__main__":
+    main()
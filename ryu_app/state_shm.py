@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Lock-free state snapshot in shared memory (a file under /dev/shm, mmap'ed).
+
+The controller (single writer, on the Ryu hub) publishes the /sdnppo/state
+JSON and the /sdnppo/links.bin bytes after every stats reply; state_server.py
+(any number of readers, other processes) serves them without touching the hub.
+
+Layout, little-endian:
+  header  "<4sHHQII" = magic b"SDNS", version, n_slots (2), seq, slot_size, 0
+  slot i  at HEADER.size + i * slot_size:
+          "<QII" = slot_seq, state_len, links_len, then state bytes, links bytes
+
+Double buffer with a per-slot seqlock: the writer fills slot (seq + 1) % 2 with
+slot_seq odd while writing and even when done, then bumps seq. A reader takes
+slot seq % 2 and accepts the copy only if slot_seq was even and unchanged
+around it, otherwise it retries; neither side ever waits on a lock.
+
+Stdlib only, so it imports in the Ryu venv both as ryu_app.state_shm and as a
+top-level module (ryu-manager loads sdnppo_ctrl_meter.py by file path), and in
+the Torch venv, where sdnppo_mn.ppo_online reuses the buffer for actor weights.
+"""
+import mmap
+import os
+import struct
+from typing import Optional, Tuple
+
+HEADER = struct.Struct("<4sHHQII")
+SLOT = struct.Struct("<QII")
+MAGIC = b"SDNS"
+VERSION = 1
+SEQ_OFFSET = 8
+
+class SnapshotWriter:
+    def __init__(self, path: str, slot_size: int = 1 << 20):
+        self.slot_size = int(slot_size)
+        size = HEADER.size + 2 * self.slot_size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, 2, 0, self.slot_size, 0)
+        for i in range(2):
+            SLOT.pack_into(self.mm, HEADER.size + i * self.slot_size, 0, 0, 0)
+        self.seq = 0
+
+    def publish(self, state: bytes, links: bytes = b"") -> bool:
+        if SLOT.size + len(state) + len(links) > self.slot_size:
+            return False
+        off = HEADER.size + ((self.seq + 1) & 1) * self.slot_size
+        slot_seq = struct.unpack_from("<Q", self.mm, off)[0]
+        struct.pack_into("<Q", self.mm, off, slot_seq + 1)
+        a = off + SLOT.size
+        self.mm[a:a + len(state)] = state
+        self.mm[a + len(state):a + len(state) + len(links)] = links
+        SLOT.pack_into(self.mm, off, slot_seq + 2, len(state), len(links))
+        self.seq += 1
+        struct.pack_into("<Q", self.mm, SEQ_OFFSET, self.seq)
+        return True
+
+    def close(self):
+        self.mm.close()
+
+class SnapshotReader:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_slots, _, self.slot_size, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or n_slots != 2:
+            self.mm.close()
+            raise ValueError(f"{path}: not a state snapshot ({magic!r} v{version})")
+        self.retries = 0
+
+    def seq(self) -> int:
+        return struct.unpack_from("<Q", self.mm, SEQ_OFFSET)[0]
+
+    def read(self, max_tries: int = 100) -> Optional[Tuple[int, bytes, bytes]]:
+        """(seq, state bytes, links bytes) of the latest complete snapshot, None before the first publish."""
+        for _ in range(max_tries):
+            seq = self.seq()
+            if seq == 0:
+                return None
+            off = HEADER.size + (seq & 1) * self.slot_size
+            s1, n_state, n_links = SLOT.unpack_from(self.mm, off)
+            a = off + SLOT.size
+            data = self.mm[a:a + n_state + n_links]
+            s2 = struct.unpack_from("<Q", self.mm, off)[0]
+            if s1 == s2 and not s1 & 1:
+                return seq, data[:n_state], data[n_state:]
+            self.retries += 1
+        return None
+
+    def close(self):
+        self.mm.close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Offline batch evaluation of policies on recorded state traces or the fluid simulator.
+
+Replay (no Mininet): every episode (run dir with steps.csv) is padded into
+(E, T, 5) arrays and each policy's batch form (policies.*_batch, or the PPO
+actor) is applied to the logged states S1..S5.
+- --prev_u logged: prev_u = the logged A of the previous step, so all E*T
+  decisions are one vectorized call (teacher forcing)
+- --prev_u self:   prev_u = the policy's own previous output, one call per step
+  over all episodes (closed loop in u, open loop in the recorded states)
+
+Simulator (--sim_envs N): closed loop on N VecFluidEnv networks, reporting the
+per-step reward_proxy as well.
+
+Reports per policy: action distribution (mean/std/percentiles/10-bin histogram),
+divergence from the logged A (MAE, RMSE, share within 0.05, correlation,
+MAE per logged policy) and decisions/sec of the policy call itself.
+
+Usage:
+  python3 -m sdnppo_mn.eval_policies --runs logs --policies util_guard const50 rr
+  python3 -m sdnppo_mn.eval_policies --runs logs --actor_state actor_state.pt --norm_json norm.json --prev_u self
+  python3 -m sdnppo_mn.eval_policies --policies util_guard rr --sim_envs 64 --topo leafspine --duration_s 480
+"""
+import argparse
+import json
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .policies import BATCH_POLICIES
+from .relabel import find_runs
+
+S_COLS = ["S1", "S2", "S3", "S4", "S5"]
+
+def load_episodes(runs: List[str]):
+    """Padded arrays S (E, T, 5), A (E, T), step (E, T), mask (E, T) and the logged policy per episode."""
+    eps = []
+    for r in runs:
+        df = pd.read_csv(f"{r}/steps.csv").sort_values("step_idx")
+        if len(df):
+            eps.append(df)
+    E = len(eps)
+    T = max((len(df) for df in eps), default=0)
+    S = np.zeros((E, T, 5))
+    A = np.full((E, T), 0.5)
+    step = np.zeros((E, T), dtype=np.int64)
+    mask = np.zeros((E, T), dtype=bool)
+    logged = []
+    for i, df in enumerate(eps):
+        n = len(df)
+        S[i, :n] = df[S_COLS].to_numpy(dtype=np.float64)
+        A[i, :n] = df["A"].to_numpy(dtype=np.float64)
+        step[i, :n] = df["step_idx"].to_numpy()
+        mask[i, :n] = True
+        logged.append(str(df["policy"].iloc[0]) if "policy" in df.columns else "")
+    return S, A, step, mask, np.array(logged)
+
+def replay(fn, S, A, step, prev_u: str = "logged", seed: int = 0):
+    """Policy actions (E, T) on the recorded states, and the seconds spent inside fn."""
+    rng = np.random.default_rng(seed)
+    E, T = A.shape
+    if prev_u == "logged":
+        prev = np.concatenate([np.full((E, 1), 0.5), A[:, :-1]], axis=1)
+        t0 = time.perf_counter()
+        U = fn(S.reshape(E * T, 5), step.reshape(-1), prev.reshape(-1), rng).reshape(E, T)
+        return U, time.perf_counter() - t0
+    U = np.empty((E, T))
+    p = np.full(E, 0.5)
+    el = 0.0
+    for t in range(T):
+        t0 = time.perf_counter()
+        p = fn(S[:, t], step[:, t], p, rng)
+        el += time.perf_counter() - t0
+        U[:, t] = p
+    return U, el
+
+def action_stats(u: np.ndarray) -> Dict[str, object]:
+    if not len(u):
+        return {"decisions": 0}
+    return {
+        "decisions": int(len(u)),
+        "u_mean": float(u.mean()),
+        "u_std": float(u.std()),
+        "u_p10": float(np.percentile(u, 10)),
+        "u_p50": float(np.percentile(u, 50)),
+        "u_p90": float(np.percentile(u, 90)),
+        "u_hist": np.histogram(u, bins=10, range=(0.0, 1.0))[0].tolist(),
+    }
+
+def divergence(U, A, mask, logged) -> Dict[str, object]:
+    d = (U - A)[mask]
+    if not len(d):
+        return {}
+    u, a = U[mask], A[mask]
+    corr = float(np.corrcoef(u, a)[0, 1]) if u.std() > 0 and a.std() > 0 else float("nan")
+    by = {}
+    for name in np.unique(logged):
+        m = mask & (logged == name)[:, None]
+        by[name] = float(np.abs(U - A)[m].mean())
+    return {
+        "mae": float(np.abs(d).mean()),
+        "rmse": float(np.sqrt((d ** 2).mean())),
+        "within_0.05": float((np.abs(d) <= 0.05).mean()),
+        "corr": corr,
+        "mae_by_logged_policy": by,
+    }
+
+def simulate(fn, n_envs: int, duration_s: int, step_s: float, topo_name: str = "leafspine",
+             seed: int = 1, topo_kw: Optional[dict] = None) -> Dict[str, object]:
+    """Closed-loop episodes on VecFluidEnv (one per env, seeds seed..seed+n_envs-1)."""
+    from .vec_env import VecFluidEnv
+    env = VecFluidEnv(topo_name, n_envs=n_envs, seeds=list(range(seed, seed + n_envs)), duration_s=duration_s,
+                      step_s=step_s, auto_reset=False, topo_kw=topo_kw)
+    rng = np.random.default_rng(seed)
+    obs = env.reset()
+    prev = np.full(n_envs, 0.5)
+    R = np.zeros((n_envs, env.max_steps))
+    U = np.zeros((n_envs, env.max_steps))
+    el = 0.0
+    t_all = time.perf_counter()
+    for t in range(env.max_steps):
+        t0 = time.perf_counter()
+        prev = fn(obs, np.full(n_envs, t), prev, rng)
+        el += time.perf_counter() - t0
+        U[:, t] = prev
+        obs, R[:, t], _, _ = env.step(prev)
+    wall = time.perf_counter() - t_all
+    ret = R.mean(axis=1)
+    return {
+        **action_stats(U.ravel()),
+        "decisions_per_s": U.size / max(el, 1e-12),
+        "sim_steps_per_s": U.size / wall,
+        "reward_mean": float(ret.mean()),
+        "reward_std_over_envs": float(ret.std()),
+    }
+
+def main(argv: Optional[List[str]] = None):
+    from .run_experiment import TOPOS, add_topo_args, topo_params
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", nargs="*", default=[], help="run dirs, sweep dirs or globs with steps.csv")
+    ap.add_argument("--policies", nargs="*", default=sorted(BATCH_POLICIES), choices=sorted(BATCH_POLICIES))
+    ap.add_argument("--actor_state", default=None, help="also evaluate this PPO actor (needs torch + --norm_json)")
+    ap.add_argument("--norm_json", default=None)
+    ap.add_argument("--prev_u", choices=["logged", "self"], default="logged")
+    ap.add_argument("--sim_envs", type=int, default=0, help="also run N closed-loop simulator episodes per policy")
+    ap.add_argument("--topo", choices=TOPOS, default="leafspine")
+    add_topo_args(ap)
+    ap.add_argument("--duration_s", type=int, default=480)
+    ap.add_argument("--step_s", type=float, default=2.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default=None)
+    args = ap.parse_args(argv)
+
+    pols = {name: BATCH_POLICIES[name] for name in args.policies}
+    if args.actor_state:
+        from .ppo_client import actor_batch_policy
+        pols["ppo"] = actor_batch_policy(args.actor_state, args.norm_json)
+
+    res = {}
+    runs = find_runs(args.runs) if args.runs else []
+    if runs:
+        t0 = time.perf_counter()
+        S, A, step, mask, logged = load_episodes(runs)
+        print(f"replay: episodes={len(runs)} steps={int(mask.sum())} load_s={time.perf_counter() - t0:.2f} "
+              f"prev_u={args.prev_u}")
+        res["logged"] = action_stats(A[mask])
+        for name, fn in pols.items():
+            U, el = replay(fn, S, A, step, args.prev_u, seed=args.seed)
+            res[name] = {**action_stats(U[mask]), "decisions_per_s": U.size / max(el, 1e-12),
+                         **divergence(U, A, mask, logged)}
+        print(f"{'policy':<12} {'u_mean':>7} {'u_p10':>6} {'u_p90':>6} {'mae':>6} {'within':>6} {'dec/s':>12}")
+        for name, r in res.items():
+            print(f"{name:<12} {r.get('u_mean', 0):>7.3f} {r.get('u_p10', 0):>6.3f} {r.get('u_p90', 0):>6.3f} "
+                  f"{r.get('mae', 0):>6.3f} {r.get('within_0.05', 1):>6.2f} {r.get('decisions_per_s', 0):>12.0f}")
+
+    if args.sim_envs > 0:
+        kw = topo_params(args.topo, args)
+        print(f"simulator: topo={args.topo} envs={args.sim_envs} steps/env={int(args.duration_s / args.step_s)}")
+        print(f"{'policy':<12} {'u_mean':>7} {'reward':>8} {'+-':>6} {'dec/s':>12} {'sim_steps/s':>12}")
+        for name, fn in pols.items():
+            r = simulate(fn, args.sim_envs, args.duration_s, args.step_s, args.topo, args.seed, kw)
+            res[f"sim:{name}"] = r
+            print(f"{name:<12} {r['u_mean']:>7.3f} {r['reward_mean']:>8.4f} {r['reward_std_over_envs']:>6.4f} "
+                  f"{r['decisions_per_s']:>12.0f} {r['sim_steps_per_s']:>12.0f}")
+
+    if not res:
+        raise SystemExit("nothing to evaluate: pass --runs and/or --sim_envs")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(res, f, indent=2)
+
+if __name__ == "__main__":
+    main()
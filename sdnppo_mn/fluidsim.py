@@ -0,0 +1,502 @@
+# -*- coding: utf-8 -*-
+"""
+Flow-level (fluid) stand-in for Mininet + the Ryu controller.
+
+Given one of the Mininet topologies and a flow trace (traffic.synth_trace or a
+logged flows.csv) it reproduces what SdnPpoController reports:
+- routing: the controller's BFS shortest path over the switch graph
+- meter:   metered (elephant/shock) flows share one drop band per source switch,
+           rate = u_to_kbps(u); meter drops are not visible in port stats
+- ports:   proportional sharing on oversubscribed egress ports, the excess is
+           counted as tx_dropped (single pass, no queueing)
+- state:   per-switch port-stats replies folded into the same EMA (a=0.5) as
+           port_stats_reply, active_flows = FlowMods younger than 120 s
+
+Everything is NumPy over a batch of N independent episodes on the same
+topology (N=1 for the REST/in-process drop-in).
+
+Usage:
+  python3 -m sdnppo_mn.fluidsim --topo leafspine --policy util_guard --duration_s 480 --step_s 2
+  python3 -m sdnppo_mn.fluidsim --topo leafspine --serve --lockstep_s 2 --rest_port 8080 [--loop]
+"""
+import argparse
+import csv
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import linkstate
+from .traffic import ELE_PORTS, SHOCK_PORTS, FlowSpec, synth_trace, load_trace
+
+METERED_PORTS = set(ELE_PORTS) | set(SHOCK_PORTS)
+STATE_KEYS = ["mean_util", "max_util", "drop_rate", "throughput_mbps", "active_flows"]
+PKT_BYTES = 1500
+# FlowMod sets per iperf3 flow: UDP data, UDP handshake reply, TCP control both ways.
+INSTALLS_PER_FLOW = 4
+FLOW_IDLE_S = 120.0
+CLEANUP_S = 5.0
+
+def host_ip(i: int) -> str:
+    """Address Mininet gives the i-th host (0-based) with the default 10.0.0.0/8 base."""
+    return socket.inet_ntoa(struct.pack("!I", (10 << 24) + i + 1))
+
+class FluidNet:
+    """Static view of a Mininet Topo: switch ports, capacities, host attachment, paths."""
+
+    def __init__(self, topo, link_cap_mbps: float = 20.0):
+        self.link_cap_mbps = float(link_cap_mbps)
+        sw_names = topo.switches()
+        self.dpid = {}
+        for i, n in enumerate(sw_names):
+            d = topo.nodeInfo(n).get("dpid")
+            self.dpid[n] = int(d, 16) if d else i + 1
+        self.switches = sorted(self.dpid.values())
+        self.sw_index = {d: i for i, d in enumerate(self.switches)}
+        self.hosts = topo.hosts()
+        self.host_ips = [(h, host_ip(i)) for i, h in enumerate(self.hosts)]
+
+        self.adj = defaultdict(set)
+        self.port_map: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self.host_loc: Dict[str, Tuple[int, int]] = {}
+        ports = []
+        for n1, n2, info in topo.links(sort=True, withKeys=False, withInfo=True):
+            cap = float(info.get("bw") or self.link_cap_mbps)
+            for a, b, pa in ((n1, n2, info["port1"]), (n2, n1, info["port2"])):
+                if a not in self.dpid:
+                    continue
+                da = self.dpid[a]
+                ports.append((self.sw_index[da], int(pa), cap))
+                if b in self.dpid:
+                    self.adj[da].add(self.dpid[b])
+                    self.port_map[da][self.dpid[b]] = int(pa)
+                else:
+                    self.host_loc[b] = (da, int(pa))
+        # Egress ports grouped by switch (dpid order), then port number.
+        ports.sort()
+        self.edges = [(self.switches[s], p) for s, p, _ in ports]
+        self.edge_index = {e: i for i, e in enumerate(self.edges)}
+        self.cap = np.array([c for _, _, c in ports], dtype=np.float64)
+        self.edge_sw = np.array([s for s, _, _ in ports], dtype=np.int64)
+        self.sw_first = np.searchsorted(self.edge_sw, np.arange(len(self.switches)))
+        self.sw_nports = np.bincount(self.edge_sw, minlength=len(self.switches)).astype(np.float64)
+        self._paths: Dict[Tuple[str, str], np.ndarray] = {}
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.edges)
+
+    @property
+    def n_switches(self) -> int:
+        return len(self.switches)
+
+    def shortest_path(self, src: int, dst: int) -> List[int]:
+        """Same BFS (and tie-breaking over adjacency sets) as SdnPpoController.shortest_path."""
+        if src == dst:
+            return [src]
+        prev = {src: None}
+        q = deque([src])
+        while q:
+            u = q.popleft()
+            for v in self.adj.get(u, []):
+                if v not in prev:
+                    prev[v] = u
+                    q.append(v)
+        if dst not in prev:
+            return []
+        path = []
+        cur = dst
+        while cur is not None:
+            path.append(cur)
+            cur = prev[cur]
+        path.reverse()
+        return path
+
+    def path_edges(self, src_host: str, dst_host: str) -> np.ndarray:
+        """Egress-port indices a src->dst flow traverses (empty if unreachable)."""
+        key = (src_host, dst_host)
+        if key not in self._paths:
+            src_sw, _ = self.host_loc[src_host]
+            dst_sw, dst_port = self.host_loc[dst_host]
+            path = self.shortest_path(src_sw, dst_sw)
+            out = []
+            for i, sw in enumerate(path):
+                port = dst_port if i == len(path) - 1 else self.port_map[sw][path[i + 1]]
+                out.append(self.edge_index[(sw, port)])
+            self._paths[key] = np.array(out, dtype=np.int64)
+        return self._paths[key]
+
+class FluidSim:
+    """Batch of N fluid episodes on one FluidNet; mirrors the controller's app API
+    (get_state / set_u / reset_metrics) plus advance(dt) to move simulated time."""
+
+    def __init__(self, net: FluidNet, traces: List[List[FlowSpec]],
+                 rate_min_kbps: int = 2000, rate_max_kbps: int = 20000,
+                 stats_interval_s: float = 1.0, ema: float = 0.5):
+        self.net = net
+        self.n = len(traces)
+        self.rate_min_kbps = int(rate_min_kbps)
+        self.rate_max_kbps = int(rate_max_kbps)
+        self.stats_interval_s = float(stats_interval_s)
+        self.ema = float(ema)
+        S = net.n_switches
+        # Replies are folded in dpid order: latest <- a^S * latest + sum_k (1-a) a^(S-1-k) x_k
+        self._ema_w = (1.0 - self.ema) * self.ema ** np.arange(S - 1, -1, -1, dtype=np.float64)
+        self._ema_keep = self.ema ** S
+
+        self.t = np.zeros(self.n)
+        self.u = np.full(self.n, 0.5)
+        self.latest = np.zeros((self.n, len(STATE_KEYS)))
+        self.warm = np.zeros(self.n, dtype=bool)
+        self.reset_t = np.zeros(self.n)
+        self.next_cleanup = np.full(self.n, CLEANUP_S)
+        self._carry = 0.0
+        self.edge_tx = np.zeros((self.n, net.n_edges))
+        self.edge_drop = np.zeros((self.n, net.n_edges))
+
+        self._compiled = [self._compile(tr) for tr in traces]
+        self._concat()
+
+    # ---- trace handling -------------------------------------------------
+    def _compile(self, trace: List[FlowSpec]):
+        net = self.net
+        start, end, rate, metered, srcsw, nhops, edges = [], [], [], [], [], [], []
+        for fs in trace:
+            pe = net.path_edges(fs.src, fs.dst)
+            if len(pe) == 0:
+                continue
+            start.append(fs.start_ts)
+            end.append(fs.start_ts + fs.duration_s)
+            rate.append(fs.rate_mbps)
+            metered.append(int(fs.dst_port) in METERED_PORTS)
+            srcsw.append(net.sw_index[net.host_loc[fs.src][0]])
+            nhops.append(len(pe))
+            edges.append(pe)
+        return {
+            "start": np.array(start, dtype=np.float64),
+            "end": np.array(end, dtype=np.float64),
+            "rate": np.array(rate, dtype=np.float64),
+            "metered": np.array(metered, dtype=bool),
+            "srcsw": np.array(srcsw, dtype=np.int64),
+            "nhops": np.array(nhops, dtype=np.float64),
+            "edges": np.concatenate(edges) if edges else np.zeros(0, dtype=np.int64),
+            "sent_mbit": np.zeros(len(start)),
+            "recv_mbit": np.zeros(len(start)),
+        }
+
+    def _concat(self):
+        c = self._compiled
+        counts = [len(x["start"]) for x in c]
+        self.f_env = np.repeat(np.arange(self.n), counts)
+        for k in ("start", "end", "rate", "metered", "srcsw", "nhops", "sent_mbit", "recv_mbit"):
+            setattr(self, "f_" + k, np.concatenate([x[k] for x in c]) if c else np.zeros(0))
+        nh = self.f_nhops.astype(np.int64)
+        self.e_flow = np.repeat(np.arange(len(nh)), nh)
+        self.e_edge = np.concatenate([x["edges"] for x in c]) if c else np.zeros(0, dtype=np.int64)
+        self.f_first = np.concatenate([[0], np.cumsum(nh)[:-1]]).astype(np.int64) if len(nh) else nh
+
+    def set_trace(self, i: int, trace: List[FlowSpec]):
+        """Replace the trace of episode i and rewind its clock (metrics are reset too)."""
+        self.set_traces({i: trace})
+
+    def set_traces(self, traces: Dict[int, List[FlowSpec]]):
+        # Keep the per-flow delivery counters of the episodes that are not replaced.
+        bounds = np.concatenate([[0], np.cumsum([len(x["start"]) for x in self._compiled])])
+        for j, x in enumerate(self._compiled):
+            x["sent_mbit"] = self.f_sent_mbit[bounds[j]:bounds[j + 1]]
+            x["recv_mbit"] = self.f_recv_mbit[bounds[j]:bounds[j + 1]]
+        for i, trace in traces.items():
+            self._compiled[i] = self._compile(trace)
+        self._concat()
+        for i in traces:
+            self.t[i] = 0.0
+            self.next_cleanup[i] = CLEANUP_S
+            self.reset_metrics(i)
+
+    # ---- controller-like API -------------------------------------------
+    def u_to_kbps(self, u):
+        u = np.clip(u, 0.0, 1.0)
+        return (self.rate_min_kbps + u * (self.rate_max_kbps - self.rate_min_kbps)).astype(np.int64)
+
+    def set_u(self, u, i: Optional[int] = None):
+        if i is None:
+            self.u[:] = np.clip(u, 0.0, 1.0)
+        else:
+            self.u[i] = float(np.clip(u, 0.0, 1.0))
+
+    def reset_metrics(self, i: Optional[int] = None):
+        sel = slice(None) if i is None else i
+        self.latest[sel] = 0.0
+        self.warm[sel] = False
+        self.reset_t[sel] = self.t[sel]
+
+    def states(self) -> np.ndarray:
+        """(N, 5) array in STATE_KEYS order (S1..S5)."""
+        return self.latest.copy()
+
+    def get_state(self, i: int = 0):
+        d = {k: float(v) for k, v in zip(STATE_KEYS, self.latest[i])}
+        d["active_flows"] = int(d["active_flows"])
+        d["u"] = float(self.u[i])
+        d["meter_kbps"] = int(self.u_to_kbps(self.u[i]))
+        d["ts"] = float(self.t[i])
+        return d
+
+    # ---- dynamics -------------------------------------------------------
+    def advance(self, dt: float):
+        """Move every episode forward by dt simulated seconds (in stats-interval ticks)."""
+        self._carry += dt
+        while self._carry >= self.stats_interval_s - 1e-9:
+            self._carry -= self.stats_interval_s
+            self.tick()
+
+    def tick(self):
+        net = self.net
+        N, E, S = self.n, net.n_edges, net.n_switches
+        dt = self.stats_interval_s
+        tm = self.t[self.f_env] + 0.5 * dt
+        offered = np.where((self.f_start <= tm) & (self.f_end > tm), self.f_rate, 0.0)
+
+        # Meter: one shared drop band per (episode, source switch).
+        meter_mbps = self.u_to_kbps(self.u) / 1000.0
+        idx = self.f_env * S + self.f_srcsw
+        agg = np.bincount(idx, weights=offered * self.f_metered, minlength=N * S)
+        cap_sw = np.repeat(meter_mbps, S)
+        scale = np.where(agg > cap_sw, cap_sw / np.maximum(agg, 1e-12), 1.0)
+        rate = offered * np.where(self.f_metered, scale[idx], 1.0)
+
+        # Egress ports: proportional sharing, excess dropped.
+        cell = self.f_env[self.e_flow] * E + self.e_edge
+        load = np.bincount(cell, weights=rate[self.e_flow], minlength=N * E).reshape(N, E)
+        cap = net.cap[None, :]
+        tx = np.minimum(load, cap)
+        drop = load - tx
+        factor = np.where(load > cap, cap / np.maximum(load, 1e-12), 1.0).ravel()
+        if len(rate):
+            ff = np.minimum.reduceat(factor[cell], self.f_first)
+            self.f_sent_mbit += offered * dt
+            self.f_recv_mbit += rate * ff * dt
+        self.edge_tx, self.edge_drop = tx, drop
+
+        # Per-switch port-stats replies, folded into the EMA.
+        util = tx / net.link_cap_mbps
+        pkts = tx * 1e6 * dt / 8.0 / PKT_BYTES
+        dpk = drop * 1e6 * dt / 8.0 / PKT_BYTES
+        first = net.sw_first
+        sw_mean = np.add.reduceat(util, first, axis=1) / net.sw_nports[None, :]
+        sw_max = np.maximum.reduceat(util, first, axis=1)
+        sw_pk = np.add.reduceat(pkts, first, axis=1)
+        sw_dpk = np.add.reduceat(dpk, first, axis=1)
+        sw_drop = np.where(sw_pk > 0, sw_dpk / (sw_pk + 1.0), 0.0)
+        sw_thr = np.add.reduceat(tx, first, axis=1) * dt / self.stats_interval_s
+        x = np.stack([sw_mean, sw_max, sw_drop, sw_thr], axis=2)
+        x[~self.warm] = 0.0  # first reply after (re)start has no previous counters
+        self.latest[:, :4] = self._ema_keep * self.latest[:, :4] + np.einsum("nsk,s->nk", x, self._ema_w)
+        self.warm[:] = True
+
+        self.t += dt
+        due = self.t >= self.next_cleanup
+        if due.any():
+            t_f = self.t[self.f_env]
+            live = (self.f_start <= t_f) & (self.f_start > t_f - FLOW_IDLE_S) & (self.f_start >= self.reset_t[self.f_env])
+            cnt = np.bincount(self.f_env, weights=self.f_nhops * INSTALLS_PER_FLOW * live, minlength=N)
+            self.latest[due, 4] = cnt[due]
+            self.next_cleanup[due] += CLEANUP_S
+
+def build(topo_name: str, bw: int = 20, delay: str = "1ms", link_cap_mbps: float = 20.0, **topo_kw) -> FluidNet:
+    from .run_experiment import topo
+    return FluidNet(topo(topo_name, bw, delay, **topo_kw), link_cap_mbps=link_cap_mbps)
+
+def serve(sim: FluidSim, host: str, port: int, speedup: float = 0.0, lockstep_s: float = 0.0,
+          next_trace=None, duration_s: float = 0.0):
+    """Serve /sdnppo/state|action|reset for episode 0.
+
+    speedup > 0: simulated time runs at speedup x wall clock.
+    lockstep_s > 0: every POST /sdnppo/action advances lockstep_s simulated seconds,
+    so clients run as fast as they poll (e.g. ppo_client --step_s 0.01).
+    next_trace(episode) -> trace: restart on it once duration_s simulated seconds have
+    passed (--loop); without it the network goes idle when the trace ends.
+    """
+    lock = threading.Lock()
+    wall = [time.time()]
+    episode = [0]
+
+    def maybe_restart():
+        if next_trace is not None and sim.t[0] >= duration_s:
+            episode[0] += 1
+            sim.set_trace(0, next_trace(episode[0]))
+    links = linkstate.link_index(sim.net.port_map)
+    link_edges = np.array([sim.net.edge_index[(s, p)] for s, p, _ in links], dtype=np.int64)
+
+    def link_vectors():
+        tx = sim.edge_tx[0, link_edges]
+        load = tx + sim.edge_drop[0, link_edges]
+        return tx / sim.net.link_cap_mbps, np.where(load > 0, sim.edge_drop[0, link_edges] / np.maximum(load, 1e-12), 0.0)
+
+    def sync():
+        if speedup > 0:
+            now = time.time()
+            sim.advance((now - wall[0]) * speedup)
+            wall[0] = now
+            maybe_restart()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *a):
+            pass
+
+        def _reply(self, obj, content_type="application/json"):
+            body = obj if isinstance(obj, bytes) else json.dumps(obj).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _payload(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(n).decode("utf-8")) if n else {}
+            except Exception:
+                return {}
+
+        def do_GET(self):
+            with lock:
+                sync()
+                if self.path == "/sdnppo/state":
+                    return self._reply(sim.get_state(0))
+                if self.path == "/sdnppo/topology":
+                    net = sim.net
+                    return self._reply({"switches": net.n_switches,
+                                        "links": sum(len(v) for v in net.adj.values()),
+                                        "datapaths": net.n_switches, "hosts": len(net.hosts)})
+                if self.path == "/sdnppo/links":
+                    util, drop = link_vectors()
+                    return self._reply({"topo_version": 1, "ts": float(sim.t[0]), "links": [list(x) for x in links],
+                                        "util": util.tolist(), "drop": drop.tolist()})
+                if self.path == "/sdnppo/links.bin":
+                    util, drop = link_vectors()
+                    return self._reply(linkstate.encode(1, float(sim.t[0]), util, drop), "application/octet-stream")
+            self.send_error(404)
+
+        def do_POST(self):
+            payload = self._payload()
+            with lock:
+                sync()
+                if self.path == "/sdnppo/action":
+                    sim.set_u(float(payload.get("u", 0.5)), 0)
+                    if lockstep_s > 0:
+                        sim.advance(lockstep_s)
+                        maybe_restart()
+                    st = sim.get_state(0)
+                    return self._reply({"ok": True, "u": st["u"], "meter_kbps": st["meter_kbps"]})
+                if self.path == "/sdnppo/reset":
+                    sim.reset_metrics(0)
+                    return self._reply({"ok": True})
+                if self.path == "/sdnppo/hosts":
+                    return self._reply({"ok": True, "learned": 0})
+            self.send_error(404)
+
+    srv = ThreadingHTTPServer((host, port), Handler)
+    print(f"[fluidsim] serving on http://{host}:{port} (speedup={speedup}, lockstep_s={lockstep_s})")
+    try:
+        srv.serve_forever()
+    finally:
+        srv.server_close()
+
+def run_episode(sim: FluidSim, pol, outdir: str, run_id: str, topo_name: str, policy_name: str,
+                trace: List[FlowSpec], duration_s: int, step_s: float, t0: float):
+    """In-process equivalent of the run_experiment step loop; writes the same logs."""
+    from .run_experiment import reward_proxy
+    fields = ["run_id","topo","policy","step_idx","ts","S1","S2","S3","S4","S5","A","R","Sp1","Sp2","Sp3","Sp4","Sp5"]
+    sim.reset_metrics(0)
+    prev_s = prev_a = prev_r = prev_ts = None
+    u_prev = 0.5
+    n_steps = int(duration_s / step_s)
+    with open(os.path.join(outdir, "steps.csv"), "w", newline="") as f_steps, \
+         open(os.path.join(outdir, "ryu_state.jsonl"), "w") as f_state:
+        w = csv.DictWriter(f_steps, fieldnames=fields)
+        w.writeheader()
+        for step_idx in range(n_steps + 1):
+            st = sim.get_state(0)
+            ts = t0 + st["ts"]
+            st["ts"] = ts
+            f_state.write(json.dumps({"ts": ts, **st}) + "\n")
+            s = {f"S{i+1}": float(st[k]) for i, k in enumerate(STATE_KEYS)}
+            if prev_s is not None:
+                w.writerow({"run_id": run_id, "topo": topo_name, "policy": policy_name,
+                            "step_idx": step_idx - 1, "ts": prev_ts, **prev_s,
+                            "A": float(prev_a), "R": float(prev_r),
+                            **{f"Sp{i+1}": s[f"S{i+1}"] for i in range(5)}})
+            u = float(pol(st, step_idx, prev_u=u_prev))
+            u_prev = u
+            sim.set_u(u, 0)
+            r = reward_proxy(st)
+            prev_s, prev_a, prev_r, prev_ts = s, u, r, ts
+            sim.advance(step_s)
+    with open(os.path.join(outdir, "flows.csv"), "w", newline="") as f:
+        wf = csv.writer(f)
+        wf.writerow(["flow_id","src","dst","dst_ip","dst_port","proto","rate_mbps","duration_s","flow_type","start_ts"])
+        for fs in trace:
+            wf.writerow([fs.flow_id, fs.src, fs.dst, fs.dst_ip, fs.dst_port, fs.proto,
+                         fs.rate_mbps, fs.duration_s, fs.flow_type, t0 + fs.start_ts])
+
+def main():
+    from .run_experiment import TOPOS, add_topo_args, topo_params
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topo", choices=TOPOS, default="leafspine")
+    ap.add_argument("--policy", choices=["util_guard", "const50", "rr"], default="util_guard")
+    ap.add_argument("--duration_s", type=int, default=480)
+    ap.add_argument("--step_s", type=float, default=2.0)
+    ap.add_argument("--bw", type=int, default=20)
+    ap.add_argument("--delay", default="1ms")
+    ap.add_argument("--seed", type=int, default=1)
+    add_topo_args(ap)
+    ap.add_argument("--trace", default=None, help="replay a logged flows.csv instead of synthesizing traffic")
+    ap.add_argument("--link_cap_mbps", type=float, default=float(os.environ.get("SDNPPO_LINK_CAP_MBPS", "20")))
+    ap.add_argument("--rate_min_kbps", type=int, default=int(os.environ.get("SDNPPO_RATE_MIN_KBPS", "2000")))
+    ap.add_argument("--rate_max_kbps", type=int, default=int(os.environ.get("SDNPPO_RATE_MAX_KBPS", "20000")))
+    ap.add_argument("--serve", action="store_true", help="serve the controller REST API instead of running a policy")
+    ap.add_argument("--rest_host", default="127.0.0.1")
+    ap.add_argument("--rest_port", type=int, default=8080)
+    ap.add_argument("--speedup", type=float, default=0.0)
+    ap.add_argument("--lockstep_s", type=float, default=0.0)
+    ap.add_argument("--loop", action="store_true",
+                    help="--serve: restart on a new trace (seed + episode, or --trace again) every --duration_s")
+    args = ap.parse_args()
+
+    net = build(args.topo, args.bw, args.delay, args.link_cap_mbps, **topo_params(args.topo, args))
+    trace = load_trace(args.trace) if args.trace else synth_trace(net.host_ips, args.duration_s, seed=args.seed)
+    sim = FluidSim(net, [trace], rate_min_kbps=args.rate_min_kbps, rate_max_kbps=args.rate_max_kbps)
+
+    if args.serve:
+        if args.speedup <= 0 and args.lockstep_s <= 0:
+            args.speedup = 1.0
+        next_trace = None
+        if args.loop:
+            next_trace = (lambda ep: load_trace(args.trace)) if args.trace else \
+                (lambda ep: synth_trace(net.host_ips, args.duration_s, seed=args.seed + ep))
+        serve(sim, args.rest_host, args.rest_port, speedup=args.speedup, lockstep_s=args.lockstep_s,
+              next_trace=next_trace, duration_s=args.duration_s)
+        return
+
+    from .run_experiment import policy
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + f"_{args.topo}_{args.policy}_seed{args.seed}_sim"
+    outdir = os.path.join("logs", run_id)
+    os.makedirs(outdir, exist_ok=True)
+    t_wall = time.time()
+    run_episode(sim, policy(args.policy), outdir, run_id, args.topo, args.policy, trace,
+                args.duration_s, args.step_s, t0=t_wall)
+    el = time.time() - t_wall
+    print(f"DONE ({args.duration_s}s simulated in {el:.2f}s, {args.duration_s / max(el, 1e-9):.0f}x real time)")
+    print("steps.csv:", os.path.join(outdir, "steps.csv"))
+
+if __name__ == "__main__":
+    main()
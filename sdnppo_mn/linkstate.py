@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Binary per-link state served at GET /sdnppo/links.bin (controller and fluidsim --serve).
+
+Layout, little-endian:
+  header  "<4sHHIId" = magic b"SDNL", version, n_fields, n_links, topo_version, ts
+  body    n_fields x n_links float32, field-major: util[n_links], drop[n_links]
+
+Link i is the i-th (src_dpid, src_port, dst_dpid) of the switch-to-switch links
+sorted by (src_dpid, src_port); GET /sdnppo/links returns that index as JSON and
+only changes when topo_version does. util = tx / link capacity and drop =
+tx_dropped / (tx_packets + tx_dropped), both over the last stats interval.
+"""
+import struct
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+HEADER = struct.Struct("<4sHHIId")
+MAGIC = b"SDNL"
+VERSION = 1
+FIELDS = ("util", "drop")
+
+def link_index(port_map) -> List[Tuple[int, int, int]]:
+    return sorted((s, p, d) for s, nbrs in port_map.items() for d, p in nbrs.items())
+
+def encode(topo_version: int, ts: float, util, drop) -> bytes:
+    body = np.stack([np.asarray(util, dtype="<f4"), np.asarray(drop, dtype="<f4")])
+    return HEADER.pack(MAGIC, VERSION, len(FIELDS), body.shape[1], topo_version, ts) + body.tobytes()
+
+def decode(buf) -> Tuple[Dict[str, object], np.ndarray]:
+    """(header dict, float32 view of shape (n_fields, n_links)); the array shares memory with buf."""
+    magic, version, n_fields, n_links, topo_version, ts = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"bad link state header: {magic!r} v{version}")
+    arr = np.frombuffer(buf, dtype="<f4", count=n_fields * n_links, offset=HEADER.size)
+    hdr = {"n_fields": n_fields, "n_links": n_links, "topo_version": topo_version, "ts": ts}
+    return hdr, arr.reshape(n_fields, n_links)
@@ -18,3 +18,33 @@ def util_guard(state, step_idx, prev_u=0.5):
         target = 0.45 + boost + random.uniform(-0.05, 0.05)
     u = 0.7 * prev_u + 0.3 * target
     return max(0.05, min(0.95, u))
+
+# ---- batch forms: S (N, 5) = S1..S5, step_idx (N,), prev_u (N,) -> u (N,) ----
+# Same decisions as above; util_guard draws its noise from rng for every row.
+# numpy is imported lazily so run_experiment keeps working in a numpy-less Mininet venv.
+
+def const50_batch(S, step_idx, prev_u, rng=None):
+    import numpy as np
+    return np.full(len(S), 0.5)
+
+def rr_batch(S, step_idx, prev_u, rng=None):
+    import numpy as np
+    return np.where(np.asarray(step_idx) % 2 == 0, 0.3, 0.8)
+
+def util_guard_batch(S, step_idx, prev_u, rng=None):
+    import numpy as np
+    S = np.asarray(S, dtype=np.float64)
+    rng = rng if rng is not None else np.random.default_rng()
+    max_util = S[:, 1]
+    drop_rate = S[:, 2]
+    boost = 0.35 * np.tanh(2.0 * (0.75 - max_util))
+    target = np.where((max_util > 0.80) | (drop_rate > 0.02), 0.15,
+                      0.45 + boost + rng.uniform(-0.05, 0.05, size=len(S)))
+    u = 0.7 * np.asarray(prev_u, dtype=np.float64) + 0.3 * target
+    return np.clip(u, 0.05, 0.95)
+
+BATCH_POLICIES = {
+    "util_guard": util_guard_batch,
+    "const50": const50_batch,
+    "rr": rr_batch,
+}
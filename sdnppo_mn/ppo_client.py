@@ -23,21 +23,22 @@ def http_post(url: str, payload: dict, timeout=2.0):
     with urlopen(req, timeout=timeout) as r:
         return json.loads(r.read().decode("utf-8"))
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--controller_ip", default="127.0.0.1")
-    ap.add_argument("--rest_port", type=int, default=8080)
-    ap.add_argument("--step_s", type=float, default=2.0)
-    ap.add_argument("--duration_s", type=int, default=480)
-    ap.add_argument("--actor_state", required=True)
-    ap.add_argument("--norm_json", required=True)
-    args = ap.parse_args()
+def http_get_bytes(url: str, timeout=2.0) -> bytes:
+    from urllib.request import Request, urlopen
+    with urlopen(Request(url, method="GET"), timeout=timeout) as r:
+        return r.read()
 
-    import torch
+def link_obs(rest: str):
+    """(header, per-link [util..., drop...]) from /sdnppo/links.bin, decoded without copying (float32)."""
+    from .linkstate import decode
+    hdr, arr = decode(http_get_bytes(rest + "/sdnppo/links.bin"))
+    return hdr, arr.reshape(-1)
+
+def make_actor(obs_dim, act_dim=1, hidden=128):
     import torch.nn as nn
 
     class Actor(nn.Module):
-        def __init__(self, obs_dim, act_dim=1, hidden=128):
+        def __init__(self):
             super().__init__()
             self.net = nn.Sequential(
                 nn.Linear(obs_dim, hidden), nn.Tanh(),
@@ -47,35 +48,128 @@ def main():
         def forward(self, x):
             return self.net(x)
 
-    with open(args.norm_json, "r") as f:
+    return Actor()
+
+def load_norm(norm_json: str, extra_dims: int = 0):
+    """(mean, var, eps) from export_norm's norm.json.
+
+    extra_dims inputs beyond the normalized columns (link observations, already in [0, 1]) pass through.
+    """
+    with open(norm_json, "r") as f:
         norm = json.load(f)
-    mean = norm["mean"]
-    var = norm["var"]
-    eps = float(norm.get("eps", 1e-8))
-    obs_dim = len(mean)
+    mean = list(norm["mean"]) + [0.0] * extra_dims
+    var = list(norm["var"]) + [1.0] * extra_dims
+    return mean, var, float(norm.get("eps", 1e-8))
 
-    actor = Actor(obs_dim, 1)
-    actor.load_state_dict(torch.load(args.actor_state, map_location="cpu"))
+def load_actor(actor_state: str, norm_json: str, extra_dims: int = 0):
+    """(actor in eval mode, mean, var, eps) from a saved state_dict and export_norm's norm.json."""
+    import torch
+    mean, var, eps = load_norm(norm_json, extra_dims)
+    actor = make_actor(len(mean), 1)
+    actor.load_state_dict(torch.load(actor_state, map_location="cpu"))
     actor.eval()
+    return actor, mean, var, eps
+
+def actor_batch_policy(actor_state: str, norm_json: str):
+    """PPO actor as a batch policy (S (N, 5), step_idx, prev_u, rng) -> u (N,), like policies.*_batch."""
+    import numpy as np
+    import torch
+    actor, mean, var, eps = load_actor(actor_state, norm_json)
+    mean = np.asarray(mean, dtype=np.float32)
+    std = np.sqrt(np.asarray(var, dtype=np.float32) + eps)
+
+    def act(S, step_idx, prev_u, rng=None):
+        x = (np.asarray(S, dtype=np.float32)[:, :len(mean)] - mean) / std
+        with torch.no_grad():
+            a_raw = actor(torch.from_numpy(x)).numpy()[:, 0].astype(np.float64)
+        return np.clip(1.0 / (1.0 + np.exp(-a_raw)), 0.05, 0.95)
+    return act
+
+def read_state(rest: str, links=None):
+    """S1..S5 (+ per-link util/drop when links = (n_links, topo_version) seen at startup) as float32."""
+    import numpy as np
+    st = http_get(rest + "/sdnppo/state")
+    s = np.empty(5 + (2 * links[0] if links else 0), dtype=np.float32)
+    s[:5] = [
+        float(st.get("mean_util", 0.0)),
+        float(st.get("max_util", 0.0)),
+        float(st.get("drop_rate", 0.0)),
+        float(st.get("throughput_mbps", 0.0)),
+        float(st.get("active_flows", 0.0)),
+    ]
+    if links:
+        hdr, lv = link_obs(rest)
+        if (hdr["n_links"], hdr["topo_version"]) != tuple(links):
+            raise SystemExit(f"topology changed: links.bin has {hdr['n_links']} links at topo_version "
+                             f"{hdr['topo_version']}, the actor was started on {links[0]} at {links[1]}; "
+                             "restart ppo_client with an actor for the new link set")
+        s[5:] = lv
+    return s
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--controller_ip", default="127.0.0.1")
+    ap.add_argument("--rest_port", type=int, default=8080)
+    ap.add_argument("--step_s", type=float, default=2.0)
+    ap.add_argument("--duration_s", type=int, default=480)
+    ap.add_argument("--actor_state", default=None, help="frozen actor (required unless --online)")
+    ap.add_argument("--norm_json", required=True)
+    ap.add_argument("--link_obs", action="store_true",
+                    help="append per-link util/drop (binary /sdnppo/links.bin) to S1..S5; the actor must take 5 + 2*links inputs")
+    ap.add_argument("--online", action="store_true",
+                    help="sample actions from the weights ppo_online publishes and feed it transitions (see ppo_online.py)")
+    ap.add_argument("--ring", default="/dev/shm/sdnppo_rollout")
+    ap.add_argument("--weights", default="/dev/shm/sdnppo_weights")
+    args = ap.parse_args()
+    if not args.online and not args.actor_state:
+        ap.error("--actor_state is required without --online")
+
+    import numpy as np
+    import torch
 
     rest = f"http://{args.controller_ip}:{args.rest_port}"
+    links = None
+    if args.link_obs:
+        hdr, _ = link_obs(rest)
+        links = (hdr["n_links"], hdr["topo_version"])
+    n_extra = 2 * links[0] if links else 0
+    online = None
+    if args.online:
+        from .ppo_online import OnlineActor
+        from .rewards import reward_proxy_batch
+        mean, var, eps = load_norm(args.norm_json, extra_dims=n_extra)
+        online = OnlineActor(args.ring, args.weights, len(mean))
+    else:
+        actor, mean, var, eps = load_actor(args.actor_state, args.norm_json, extra_dims=n_extra)
+    mean = np.asarray(mean, dtype=np.float32)
+    std = np.sqrt(np.asarray(var, dtype=np.float32) + eps)
+
     end_ts = time.time() + args.duration_s
+    prev = None
 
     while time.time() < end_ts:
-        st = http_get(rest + "/sdnppo/state")
-        s = [
-            float(st.get("mean_util", 0.0)),
-            float(st.get("max_util", 0.0)),
-            float(st.get("drop_rate", 0.0)),
-            float(st.get("throughput_mbps", 0.0)),
-            float(st.get("active_flows", 0.0)),
-        ]
-        s_norm = [(s[i] - mean[i]) / ((var[i] + eps) ** 0.5) for i in range(obs_dim)]
-        with torch.no_grad():
-            a_raw = float(actor(torch.tensor([s_norm], dtype=torch.float32)).item())
+        s = read_state(rest, links)
+        s_norm = (s - mean) / std
+        if online:
+            # the previous action's reward is reward_proxy of this, its successor state (rewards.proxy_next),
+            # unlike steps.csv's R, which scores the state the action was chosen in
+            if prev is not None:
+                online.record(*prev, float(reward_proxy_batch(s[:5])))
+            online.maybe_swap()
+            a_raw, logp = online.act(s_norm)
+            prev = (s_norm, a_raw, logp)
+        else:
+            with torch.no_grad():
+                a_raw = float(actor(torch.from_numpy(s_norm[None])).item())
         u = clamp(sigmoid(a_raw), 0.05, 0.95)
         http_post(rest + "/sdnppo/action", {"u": u})
         time.sleep(args.step_s)
 
+    if online:
+        if prev is not None:
+            online.record(*prev, float(reward_proxy_batch(read_state(rest))), done=True)
+        print("[ppo_client] online " + " ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}"
+                                              for k, v in online.stats().items()))
+
 if __name__ == "__main__":
     main()
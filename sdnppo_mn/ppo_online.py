@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""
+Online PPO: ppo_client --online acts, this trainer learns, both share two /dev/shm files.
+
+- rollout ring (RolloutRing, --ring): the client appends one transition per step,
+  normalized obs, raw Gaussian action, its log-prob under the acting weights,
+  reward_proxy of the next state, done and the acting weights version. The
+  reward is rewards.proxy_next, not the R column of steps.csv (reward_proxy of
+  the state the action was chosen in): relabel offline data with proxy_next to
+  match. Single writer; the trainer follows with its own cursor and skips
+  rows the writer has already lapped (counted as dropped).
+- weights (seqlock double buffer of ryu_app/state_shm.py, --weights; that module is
+  stdlib-only and shared with the controller, imported as ryu_app.state_shm or, when
+  the repo root is not on sys.path, loaded from its file): after every update the
+  trainer publishes the actor parameters + log_std as float32; the snapshot seq
+  is the weights version. The client checks seq between steps and hot-swaps.
+
+Layout of the ring, little-endian:
+  header  "<4sHHIIQQ" = magic b"SDNR", version, 0, obs_dim, capacity, head, tail
+  rows    capacity x ROW(obs_dim) starting at HEADER.size
+head = rows written (client), tail = rows consumed (trainer); row i is at i % capacity.
+
+Trainer: fixed-length rollouts of --rollout transitions plus one lookahead row
+for the bootstrap value, GAE(--gamma, --lam), clipped surrogate against the
+client's behavior log-probs (so stale rows are importance-weighted), --epochs
+passes over --minibatch, Adam on CPU. Policy: u = sigmoid(a), a ~ N(actor(obs), exp(log_std)),
+the same actor network ppo_client runs frozen (make_actor).
+
+Metrics (stdout + --metrics jsonl, one line per update): transitions/s, updates/s,
+ring lag (rows written but not consumed), dropped rows and staleness = trainer
+version minus the acting version of each row (mean/max over the rollout).
+
+Usage (Torch venv; start the trainer first, it creates both files):
+  python3 -m sdnppo_mn.ppo_online --obs_dim 5 --actor_state actor_state.pt --rollout 128 --save actor_online.pt
+  python3 -m sdnppo_mn.ppo_client --online --norm_json norm.json --duration_s 3600 --step_s 2
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+import numpy as np
+
+try:
+    from ryu_app.state_shm import SnapshotReader, SnapshotWriter
+except ImportError:  # repo root not on sys.path: load the stdlib-only module from its file
+    import importlib.util
+    _spec = importlib.util.spec_from_file_location(
+        "state_shm", os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "ryu_app", "state_shm.py"))
+    _shm = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(_shm)
+    SnapshotReader, SnapshotWriter = _shm.SnapshotReader, _shm.SnapshotWriter
+
+HEADER = struct.Struct("<4sHHIIQQ")
+MAGIC = b"SDNR"
+VERSION = 1
+HEAD_OFFSET = 16
+TAIL_OFFSET = 24
+
+RING_PATH = "/dev/shm/sdnppo_rollout"
+WEIGHTS_PATH = "/dev/shm/sdnppo_weights"
+
+def row_dtype(obs_dim: int) -> np.dtype:
+    return np.dtype([("obs", "<f4", (obs_dim,)), ("act", "<f4"), ("logp", "<f4"),
+                     ("rew", "<f4"), ("done", "<f4"), ("ver", "<u4")])
+
+class RolloutRing:
+    def __init__(self, path: str, obs_dim: Optional[int] = None, capacity: int = 1 << 16):
+        """Create (obs_dim given) or open (obs_dim None) the ring at path."""
+        if obs_dim is not None:
+            size = HEADER.size + int(capacity) * row_dtype(obs_dim).itemsize
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.ftruncate(fd, size)
+                self.mm = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+            HEADER.pack_into(self.mm, 0, MAGIC, VERSION, 0, obs_dim, capacity, 0, 0)
+        else:
+            fd = os.open(path, os.O_RDWR)
+            try:
+                self.mm = mmap.mmap(fd, 0)
+            finally:
+                os.close(fd)
+        magic, version, _, self.obs_dim, self.capacity, _, _ = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: not a rollout ring ({magic!r} v{version})")
+        self.rows = np.ndarray((self.capacity,), dtype=row_dtype(self.obs_dim), buffer=self.mm, offset=HEADER.size)
+
+    def head(self) -> int:
+        return struct.unpack_from("<Q", self.mm, HEAD_OFFSET)[0]
+
+    def tail(self) -> int:
+        return struct.unpack_from("<Q", self.mm, TAIL_OFFSET)[0]
+
+    def append(self, obs, act: float, logp: float, rew: float, done: bool, ver: int):
+        """Writer side: fill row head % capacity, then publish it by bumping head."""
+        head = self.head()
+        self.rows[head % self.capacity] = (obs, act, logp, rew, float(done), ver)
+        struct.pack_into("<Q", self.mm, HEAD_OFFSET, head + 1)
+
+    def read(self, cursor: int, n: int):
+        """(rows copy, start) of n consecutive rows from max(cursor, oldest intact row), or (None, start) if fewer are ready."""
+        head = self.head()
+        # row `head` shares its slot with head - capacity and may be half-written
+        lo = max(cursor, head - self.capacity + 1)
+        if head - lo < n:
+            return None, lo
+        rows = self.rows[np.arange(lo, lo + n) % self.capacity]
+        # rows the writer lapped while we copied are torn: retry from the new oldest row
+        if self.head() - self.capacity + 1 > lo:
+            return None, self.head() - self.capacity + 1
+        return rows, lo
+
+    def set_tail(self, tail: int):
+        struct.pack_into("<Q", self.mm, TAIL_OFFSET, tail)
+
+    def close(self):
+        self.rows = None
+        self.mm.close()
+
+def gae(rew: np.ndarray, val: np.ndarray, done: np.ndarray, gamma: float = 0.99, lam: float = 0.95):
+    """(advantages, returns) for T transitions; val has T + 1 entries (bootstrap last), done[t] cuts at t."""
+    T = len(rew)
+    adv = np.zeros(T, dtype=np.float32)
+    last = 0.0
+    for t in range(T - 1, -1, -1):
+        nonterm = 1.0 - float(done[t])
+        delta = rew[t] + gamma * val[t + 1] * nonterm - val[t]
+        last = delta + gamma * lam * nonterm * last
+        adv[t] = last
+    return adv, adv + val[:T]
+
+def gauss_logp(a, mu, log_std):
+    return -0.5 * ((a - mu) / math.exp(log_std)) ** 2 - log_std - 0.5 * math.log(2.0 * math.pi)
+
+def publish_weights(writer: SnapshotWriter, actor, log_std, meta: dict) -> int:
+    """Actor parameters + log_std as one float32 vector; returns the new weights version (snapshot seq)."""
+    import torch
+    from torch.nn.utils import parameters_to_vector
+    with torch.no_grad():
+        vec = torch.cat([parameters_to_vector(actor.parameters()), log_std.reshape(1)])
+    meta = dict(meta, version=writer.seq + 1, ts=time.time())
+    if not writer.publish(json.dumps(meta).encode("utf-8"), vec.numpy().astype("<f4").tobytes()):
+        raise RuntimeError("weights snapshot larger than its slot")
+    return writer.seq
+
+class OnlineActor:
+    """Client side: samples actions from the latest published weights and appends transitions to the ring."""
+
+    def __init__(self, ring_path: str, weights_path: str, obs_dim: int, wait_s: float = 30.0):
+        import torch
+        from .ppo_client import make_actor
+        t_end = time.time() + wait_s
+        self.ring = self.weights = None
+        while True:
+            # each file is mapped once, as soon as the trainer has written its header
+            try:
+                if self.ring is None and os.path.exists(ring_path):
+                    self.ring = RolloutRing(ring_path)
+                if self.weights is None and os.path.exists(weights_path):
+                    self.weights = SnapshotReader(weights_path)
+            except (OSError, ValueError):
+                pass
+            if self.ring is not None and self.weights is not None and self.weights.seq() > 0:
+                break
+            if time.time() > t_end:
+                self.close()
+                raise SystemExit(f"no trainer weights at {weights_path} / ring at {ring_path} after {wait_s:.0f} s")
+            time.sleep(0.2)
+        if self.ring.obs_dim != obs_dim:
+            raise SystemExit(f"ring obs_dim {self.ring.obs_dim} != client obs_dim {obs_dim}")
+        _, meta, _ = self.weights.read()
+        meta = json.loads(meta)
+        self.actor = make_actor(obs_dim, 1, int(meta.get("hidden", 128)))
+        self.actor.eval()
+        self.torch = torch
+        self.version = 0
+        self.published_ts = 0.0
+        self.log_std = 0.0
+        self.swaps = 0
+        self.swap_s = 0.0
+        self.steps = 0
+        self.lag_versions = 0
+        self.age_s = 0.0
+        self.maybe_swap()
+
+    def maybe_swap(self) -> bool:
+        """Load newer weights if the trainer published any since the last step."""
+        from torch.nn.utils import vector_to_parameters
+        if self.weights.seq() == self.version:
+            return False
+        t0 = time.perf_counter()
+        snap = self.weights.read()
+        if snap is None:
+            return False
+        seq, meta, raw = snap
+        vec = self.torch.tensor(np.frombuffer(raw, dtype="<f4"))
+        vector_to_parameters(vec[:-1], self.actor.parameters())
+        self.log_std = float(vec[-1])
+        self.version = seq
+        self.published_ts = float(json.loads(meta).get("ts", 0.0))
+        self.swaps += 1
+        self.swap_s += time.perf_counter() - t0
+        return True
+
+    def act(self, s_norm):
+        """(raw action, log-prob) sampled around the actor's mean; u = sigmoid(raw action)."""
+        x = self.torch.from_numpy(np.asarray(s_norm, dtype=np.float32)[None])
+        with self.torch.no_grad():
+            mu = float(self.actor(x).item())
+        a = mu + math.exp(self.log_std) * float(np.random.standard_normal())
+        self.steps += 1
+        self.lag_versions += self.weights.seq() - self.version
+        self.age_s += time.time() - self.published_ts
+        return a, gauss_logp(a, mu, self.log_std)
+
+    def record(self, s_norm, a: float, logp: float, r: float, done: bool = False):
+        self.ring.append(s_norm, a, logp, r, done, self.version)
+
+    def close(self):
+        for m in (self.ring, self.weights):
+            if m is not None:
+                m.close()
+
+    def stats(self) -> dict:
+        n = max(self.steps, 1)
+        return {
+            "steps": self.steps,
+            "version": self.version,
+            "swaps": self.swaps,
+            "swap_ms_mean": 1e3 * self.swap_s / max(self.swaps, 1),
+            "lag_versions_mean": self.lag_versions / n,
+            "weights_age_s_mean": self.age_s / n,
+            "ring_backlog": self.ring.head() - self.ring.tail(),
+        }
+
+def ppo_update(rows, actor, critic, log_std, opt, args) -> dict:
+    import torch
+    T = len(rows) - 1
+    obs = torch.from_numpy(np.ascontiguousarray(rows["obs"]))
+    with torch.no_grad():
+        val = critic(obs)[:, 0].numpy().astype(np.float64)
+    adv, ret = gae(rows["rew"][:T].astype(np.float64), val, rows["done"][:T], args.gamma, args.lam)
+    adv = (adv - adv.mean()) / (adv.std() + 1e-8)
+    obs = obs[:T]
+    act = torch.from_numpy(rows["act"][:T].copy())
+    logp_old = torch.from_numpy(rows["logp"][:T].copy())
+    adv_t = torch.from_numpy(adv.astype(np.float32))
+    ret_t = torch.from_numpy(ret.astype(np.float32))
+    params = list(actor.parameters()) + list(critic.parameters()) + [log_std]
+    out = {"loss_pi": 0.0, "loss_v": 0.0, "entropy": 0.0, "approx_kl": 0.0, "clipfrac": 0.0}
+    n = 0
+    for _ in range(args.epochs):
+        for mb in torch.randperm(T).split(args.minibatch):
+            dist = torch.distributions.Normal(actor(obs[mb])[:, 0], log_std.exp())
+            logp = dist.log_prob(act[mb])
+            ratio = (logp - logp_old[mb]).exp()
+            clipped = ratio.clamp(1.0 - args.clip, 1.0 + args.clip)
+            loss_pi = -torch.min(ratio * adv_t[mb], clipped * adv_t[mb]).mean()
+            loss_v = ((critic(obs[mb])[:, 0] - ret_t[mb]) ** 2).mean()
+            ent = dist.entropy().mean()
+            loss = loss_pi + args.vf_coef * loss_v - args.ent_coef * ent
+            opt.zero_grad()
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(params, args.max_grad_norm)
+            opt.step()
+            with torch.no_grad():
+                out["loss_pi"] += float(loss_pi)
+                out["loss_v"] += float(loss_v)
+                out["entropy"] += float(ent)
+                out["approx_kl"] += float((logp_old[mb] - logp).mean())
+                out["clipfrac"] += float(((ratio - 1.0).abs() > args.clip).float().mean())
+            n += 1
+    return {k: v / max(n, 1) for k, v in out.items()}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--obs_dim", type=int, default=5, help="5, or 5 + 2*links for ppo_client --link_obs")
+    ap.add_argument("--hidden", type=int, default=128)
+    ap.add_argument("--actor_state", default=None, help="initial actor weights (else random init)")
+    ap.add_argument("--log_std", type=float, default=-0.5, help="initial exploration std of the raw action")
+    ap.add_argument("--ring", default=RING_PATH)
+    ap.add_argument("--capacity", type=int, default=1 << 16, help="ring rows")
+    ap.add_argument("--weights", default=WEIGHTS_PATH)
+    ap.add_argument("--rollout", type=int, default=128, help="transitions per PPO update")
+    ap.add_argument("--epochs", type=int, default=4)
+    ap.add_argument("--minibatch", type=int, default=32)
+    ap.add_argument("--lr", type=float, default=3e-4)
+    ap.add_argument("--gamma", type=float, default=0.99)
+    ap.add_argument("--lam", type=float, default=0.95)
+    ap.add_argument("--clip", type=float, default=0.2)
+    ap.add_argument("--vf_coef", type=float, default=0.5)
+    ap.add_argument("--ent_coef", type=float, default=0.0)
+    ap.add_argument("--max_grad_norm", type=float, default=0.5)
+    ap.add_argument("--updates", type=int, default=0, help="stop after N updates (0 = until Ctrl-C)")
+    ap.add_argument("--save", default=None, help="torch.save the actor state_dict here after every update")
+    ap.add_argument("--metrics", default=None, help="append one JSON line per update")
+    ap.add_argument("--threads", type=int, default=1, help="torch CPU threads")
+    args = ap.parse_args(argv)
+
+    import torch
+    from .ppo_client import make_actor
+    torch.set_num_threads(args.threads)
+
+    actor = make_actor(args.obs_dim, 1, args.hidden)
+    if args.actor_state:
+        actor.load_state_dict(torch.load(args.actor_state, map_location="cpu"))
+    critic = make_actor(args.obs_dim, 1, args.hidden)
+    log_std = torch.nn.Parameter(torch.tensor(args.log_std))
+    opt = torch.optim.Adam(list(actor.parameters()) + list(critic.parameters()) + [log_std], lr=args.lr)
+
+    n_params = sum(p.numel() for p in actor.parameters()) + 1
+    ring = RolloutRing(args.ring, args.obs_dim, args.capacity)
+    writer = SnapshotWriter(args.weights, slot_size=4 * n_params + 4096)
+    meta = {"obs_dim": args.obs_dim, "hidden": args.hidden, "updates": 0}
+    version = publish_weights(writer, actor, log_std, meta)
+    print(f"[ppo_online] ring={args.ring} ({args.capacity} rows) weights={args.weights} "
+          f"params={n_params} v{version}; waiting for ppo_client --online")
+
+    f_metrics = open(args.metrics, "a") if args.metrics else None
+    cursor = 0
+    consumed = 0
+    dropped = 0
+    updates = 0
+    t_start = None
+    try:
+        while not args.updates or updates < args.updates:
+            t_wait = time.perf_counter()
+            while True:
+                rows, start = ring.read(cursor, args.rollout + 1)
+                if rows is not None:
+                    break
+                time.sleep(0.01)
+            dropped += start - cursor
+            t0 = time.perf_counter()
+            if t_start is None:
+                t_start = t_wait
+            stale = version - rows["ver"][:-1].astype(np.int64)
+            actor.train()
+            res = ppo_update(rows, actor, critic, log_std, opt, args)
+            updates += 1
+            consumed += args.rollout
+            cursor = start + args.rollout
+            ring.set_tail(cursor)
+            version = publish_weights(writer, actor, log_std, dict(meta, updates=updates))
+            if args.save:
+                torch.save(actor.state_dict(), args.save)
+            el = time.perf_counter() - t_start
+            m = {
+                "update": updates,
+                "version": version,
+                "transitions_per_s": consumed / el,
+                "updates_per_s": updates / el,
+                "wait_s": t0 - t_wait,
+                "update_s": time.perf_counter() - t0,
+                "lag_rows": ring.head() - cursor,
+                "dropped": dropped,
+                "staleness_mean": float(stale.mean()),
+                "staleness_max": int(stale.max()),
+                "reward_mean": float(rows["rew"][:-1].mean()),
+                "log_std": float(log_std),
+                **res,
+                "ts": time.time(),
+            }
+            print(f"[ppo_online] upd={updates} v{version} trans/s={m['transitions_per_s']:.1f} "
+                  f"upd/s={m['updates_per_s']:.3f} stale={m['staleness_mean']:.2f}/{m['staleness_max']} "
+                  f"lag={m['lag_rows']} drop={dropped} R={m['reward_mean']:.4f} kl={m['approx_kl']:.4f} "
+                  f"update_ms={1e3 * m['update_s']:.0f}")
+            if f_metrics:
+                f_metrics.write(json.dumps(m) + "\n")
+                f_metrics.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if f_metrics:
+            f_metrics.close()
+        writer.close()
+        ring.close()
+
+if __name__ == "__main__":
+    main()
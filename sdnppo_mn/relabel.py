@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Offline reward relabeling over recorded runs (run_experiment / fluidsim log layout).
+
+Per run directory (anything containing steps.csv):
+- steps.csv          transitions S1..S5, A, R, Sp1..Sp5
+- ryu_state.jsonl    raw controller snapshots, line i = state at step i -> st_* columns
+- flows.csv          + iperf3/<flow_id>.json -> per-class outcome columns for every step window:
+                     <class>_n, <class>_offered_mbps, <class>_goodput_mbps, <class>_loss
+                     (class = mice, elephant, shock; loss is NaN when traffic was offered but
+                     no overlapping flow has an iperf3 result, e.g. fluidsim runs)
+
+Rewards are rewards.py functions; each --reward adds an R_<name> column.
+
+Usage:
+  python3 -m sdnppo_mn.relabel --runs logs --reward proxy_next --reward util2=proxy_next?w_util=2.0 \
+      --reward class_qos --reward mypkg.rew:my_fn --out relabeled.csv
+  python3 -m sdnppo_mn.relabel --runs logs/<run_id> --reward class_qos --per_run
+    (writes logs/<run_id>/steps_relabeled.csv instead of one dataset)
+"""
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .rewards import load_reward
+
+CLASSES = ("mice", "elephant", "shock")
+
+def find_runs(paths: List[str]) -> List[str]:
+    """Run dirs under the given dirs/globs (a sweep directory is searched recursively)."""
+    runs = []
+    for p in paths:
+        for d in sorted(glob.glob(p)) or [p]:
+            if os.path.isfile(os.path.join(d, "steps.csv")):
+                runs.append(d)
+            else:
+                runs.extend(sorted(os.path.dirname(f) for f in
+                                   glob.glob(os.path.join(d, "**", "steps.csv"), recursive=True)))
+    return sorted(set(runs))
+
+def parse_iperf3(path: str):
+    """(loss fraction, received Mbps) from an iperf3 -J UDP client log, or (nan, nan)."""
+    try:
+        with open(path) as f:
+            j = json.load(f)
+        s = j["end"]["sum"]
+        loss = float(s.get("lost_percent", 0.0)) / 100.0
+        return loss, float(s["bits_per_second"]) * (1.0 - loss) / 1e6
+    except (OSError, ValueError, KeyError, TypeError):
+        return float("nan"), float("nan")
+
+def load_states(path: str) -> pd.DataFrame:
+    rows = []
+    if os.path.isfile(path):
+        with open(path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    df = pd.DataFrame(rows)
+    return df.add_prefix("st_")
+
+def class_outcomes(ts: np.ndarray, step_s: float, flows: pd.DataFrame, iperf_dir: str) -> pd.DataFrame:
+    """Per-step per-class offered/delivered traffic, spreading each flow's result over its lifetime."""
+    out = {}
+    t0 = ts[:, None]
+    t1 = t0 + step_s
+    for c in CLASSES:
+        fc = flows[flows["flow_type"] == c] if len(flows) else flows
+        if not len(fc):
+            for k in ("n", "offered_mbps", "goodput_mbps", "loss"):
+                out[f"{c}_{k}"] = np.zeros(len(ts))
+            continue
+        start = fc["start_ts"].to_numpy(dtype=np.float64)[None, :]
+        end = start + fc["duration_s"].to_numpy(dtype=np.float64)[None, :]
+        rate = fc["rate_mbps"].to_numpy(dtype=np.float64)
+        res = np.array([parse_iperf3(os.path.join(iperf_dir, f"{fid}.json")) for fid in fc["flow_id"]])
+        loss = res[:, 0]
+        ok = ~np.isnan(loss)
+        # fraction of each step window the flow was active
+        ov = np.clip(np.minimum(end, t1) - np.maximum(start, t0), 0.0, None) / step_s
+        offered = ov @ rate
+        # loss is rate-weighted over the flows that have an iperf3 result
+        measured = ov @ np.where(ok, rate, 0.0)
+        lost = ov @ np.where(ok, rate * loss, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cls_loss = np.where(offered > 0, np.where(measured > 0, lost / measured, np.nan), 0.0)
+        out[f"{c}_n"] = (ov > 0).sum(axis=1)
+        out[f"{c}_offered_mbps"] = offered
+        out[f"{c}_goodput_mbps"] = offered * (1.0 - cls_loss)
+        out[f"{c}_loss"] = cls_loss
+    return pd.DataFrame(out)
+
+def load_run(run_dir: str) -> pd.DataFrame:
+    """steps.csv joined with st_* snapshot columns and per-class iperf3 outcomes."""
+    df = pd.read_csv(os.path.join(run_dir, "steps.csv"))
+    if "run_id" not in df.columns:
+        df["run_id"] = os.path.basename(run_dir.rstrip("/"))
+    df["run_dir"] = run_dir
+    st = load_states(os.path.join(run_dir, "ryu_state.jsonl"))
+    if len(st):
+        st = st.drop(columns=["st_ts"], errors="ignore").iloc[df["step_idx"].clip(upper=len(st) - 1)]
+        df = pd.concat([df, st.reset_index(drop=True)], axis=1)
+    ts = df["ts"].to_numpy(dtype=np.float64)
+    step_s = float(np.median(np.diff(ts))) if len(ts) > 1 else 1.0
+    flows_path = os.path.join(run_dir, "flows.csv")
+    flows = pd.read_csv(flows_path) if os.path.isfile(flows_path) else pd.DataFrame()
+    return pd.concat([df, class_outcomes(ts, step_s, flows, os.path.join(run_dir, "iperf3"))], axis=1)
+
+def relabel(df: pd.DataFrame, specs: List[str]) -> pd.DataFrame:
+    for spec in specs:
+        name, fn, params = load_reward(spec)
+        df[f"R_{name}"] = np.asarray(fn(df, **params), dtype=np.float64)
+    return df
+
+def load_runs(runs: List[str], workers: int = 1) -> List[pd.DataFrame]:
+    if workers <= 1 or len(runs) <= 1:
+        return [load_run(r) for r in runs]
+    with mp.get_context("fork").Pool(workers) as pool:
+        return pool.map(load_run, runs)
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", nargs="+", required=True, help="run dirs, sweep dirs or globs")
+    ap.add_argument("--reward", action="append", required=True,
+                    help='"[col=]name|module:fn[?k=v&k=v]", repeatable; adds R_<col>')
+    ap.add_argument("--out", default="relabeled.csv", help=".csv or .parquet dataset of all runs")
+    ap.add_argument("--per_run", action="store_true", help="write <run>/steps_relabeled.csv instead of --out")
+    ap.add_argument("--workers", type=int, default=max(1, min(8, mp.cpu_count())))
+    args = ap.parse_args(argv)
+
+    runs = find_runs(args.runs)
+    if not runs:
+        raise SystemExit("no steps.csv found under " + " ".join(args.runs))
+    t0 = time.perf_counter()
+    frames = load_runs(runs, args.workers)
+    t_load = time.perf_counter() - t0
+    df = relabel(pd.concat(frames, ignore_index=True), args.reward)
+    t_rew = time.perf_counter() - t0 - t_load
+
+    if args.per_run:
+        for run_dir, part in df.groupby("run_dir", sort=False):
+            part.drop(columns=["run_dir"]).to_csv(os.path.join(run_dir, "steps_relabeled.csv"), index=False)
+    elif args.out.endswith(".parquet"):
+        df.to_parquet(args.out, index=False)
+    else:
+        df.to_csv(args.out, index=False)
+
+    rcols = [c for c in df.columns if c.startswith("R_")]
+    print(f"runs={len(runs)} rows={len(df)} load_s={t_load:.2f} reward_s={t_rew:.3f}")
+    if "R" in df.columns and "R_proxy" in df.columns:
+        print(f"max |R_proxy - R| = {np.nanmax(np.abs(df['R_proxy'] - df['R'])):.2e}")
+    print(df[rcols].describe().T[["mean", "std", "min", "max"]].to_string())
+    if not args.per_run:
+        print("Wrote:", args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized reward functions for offline relabeling (see relabel.py).
+
+A reward function takes the per-step table of one or many runs (pandas
+DataFrame: steps.csv columns, st_* fields from ryu_state.jsonl and the
+<class>_* iperf3 outcome columns) plus keyword parameters and returns one
+value per row. Built-ins are registered by name in REWARDS; anything else is
+referenced as "module:function".
+"""
+import importlib
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+REWARDS: Dict[str, Callable] = {}
+
+def register(name: str):
+    def deco(fn):
+        REWARDS[name] = fn
+        return fn
+    return deco
+
+def reward_proxy_batch(S):
+    """Vectorized run_experiment.reward_proxy over an (N, 5) array of S1..S5 states."""
+    S = np.asarray(S, dtype=np.float64)
+    thr = S[..., 3]
+    maxu = S[..., 1]
+    drop = S[..., 2]
+    return 1.0 * (thr / 50.0) - 1.2 * maxu - 1.5 * np.minimum(1.0, drop * 20.0)
+
+def _col(df, name):
+    return df[name].to_numpy(dtype=np.float64)
+
+@register("proxy")
+def proxy(df, w_thr=1.0 / 50.0, w_util=1.2, w_drop=1.5, drop_scale=20.0, prefix="S"):
+    """reward_proxy with tunable weights; the defaults reproduce the logged R column."""
+    thr = _col(df, f"{prefix}4")
+    maxu = _col(df, f"{prefix}2")
+    drop = _col(df, f"{prefix}3")
+    return w_thr * thr - w_util * maxu - w_drop * np.minimum(1.0, drop * drop_scale)
+
+@register("proxy_next")
+def proxy_next(df, **kw):
+    """proxy evaluated on the successor state (Sp*), i.e. the outcome of action A."""
+    return proxy(df, prefix="Sp", **kw)
+
+@register("class_qos")
+def class_qos(df, w_goodput=1.0 / 50.0, w_util=1.2, w_mice_loss=2.0, w_ele_loss=0.5, w_shock_loss=0.0):
+    """Delivered iperf3 goodput minus per-class loss penalties (mice loss weighs most).
+
+    Needs the iperf3 outcome columns; rows without iperf3 results come out NaN.
+    """
+    good = sum(_col(df, f"{c}_goodput_mbps") for c in ("mice", "elephant", "shock"))
+    return (w_goodput * good - w_util * _col(df, "Sp2")
+            - w_mice_loss * _col(df, "mice_loss")
+            - w_ele_loss * _col(df, "elephant_loss")
+            - w_shock_loss * _col(df, "shock_loss"))
+
+@register("smooth")
+def smooth(df, w_delta=0.5, base="proxy_next"):
+    """base reward minus w_delta * |A - previous A| within each run (discourages meter flapping)."""
+    a = df["A"].astype(float)
+    prev = a.groupby(df["run_id"]).shift(1).fillna(a)
+    return REWARDS[base](df) - w_delta * np.abs(a - prev).to_numpy()
+
+def _param(v: str):
+    for cast in (int, float):
+        try:
+            return cast(v)
+        except ValueError:
+            pass
+    return v
+
+def load_reward(spec: str) -> Tuple[str, Callable, dict]:
+    """Parse "[column=]target[?k=v&k=v]" where target is a REWARDS name or "module:function"."""
+    name, eq, rest = spec.partition("=")
+    if not eq or "?" in name or ":" in name:
+        name, rest = "", spec
+    target, _, query = rest.partition("?")
+    params = {}
+    for kv in [x for x in query.split("&") if x]:
+        k, _, v = kv.partition("=")
+        params[k] = _param(v)
+    if ":" in target:
+        mod, _, attr = target.partition(":")
+        fn = getattr(importlib.import_module(mod), attr)
+    elif target in REWARDS:
+        fn = REWARDS[target]
+    else:
+        raise KeyError(f"unknown reward {target!r}; built-ins: {', '.join(sorted(REWARDS))}")
+    return name or target.replace(":", "_").replace(".", "_"), fn, params
@@ -12,28 +12,117 @@ from mininet.node import RemoteController, OVSSwitch
 from mininet.link import TCLink
 
 from .topos.leafspine import LeafSpine
-from .topos.wan import MiniWAN
-from .topos.fattree import FatTreeK4
-from .traffic import start_iperf_servers, run_traffic
+from .topos.wan import MiniWAN, RandomWAN
+from .topos.fattree import FatTree, FatTreeK4
+from .traffic import start_iperf_servers, wait_for_iperf_servers, run_traffic
+from .timing import PhaseTimer
 from . import policies
 from datetime import datetime, timezone
 from pathlib import Path
 
+def controllers_connected(net):
+    """One ovs-vsctl transaction for all bridges; returns per-switch is_connected flags."""
+    args = []
+    for sw in net.switches:
+        args += ["--", "get", "Controller", sw.name, "is_connected"]
+    out = net.switches[0].cmd("ovs-vsctl " + " ".join(args)).split()
+    if len(out) != len(net.switches):
+        return [False] * len(net.switches)
+    return [o == "true" for o in out]
+
 def wait_for_ovs_controllers(net, timeout_s: float = 10.0, poll_s: float = 0.5) -> bool:
     """Best-effort: wait until all OVS bridges report controller is_connected=true."""
     t0 = time.time()
     while time.time() - t0 < timeout_s:
-        ok = True
-        for sw in net.switches:
-            out = sw.cmd(f"ovs-vsctl get Controller {sw.name} is_connected").strip()
-            if out != "true":
-                ok = False
-                break
-        if ok:
+        if all(controllers_connected(net)):
             return True
         time.sleep(poll_s)
     return False
 
+def report_controller_failure(net):
+    for sw in net.switches:
+        tgt = sw.cmd(f"ovs-vsctl get Controller {sw.name} target").strip()
+        isc = sw.cmd(f"ovs-vsctl get Controller {sw.name} is_connected").strip()
+        print(f"  {sw.name}: target={tgt} is_connected={isc}")
+
+def configure_switches(net, controller_ip, of_port):
+    """Restrict every bridge to OF1.3 and force a fresh controller connection, two ovs-vsctl calls in total."""
+    drop, add = [], []
+    for sw in net.switches:
+        drop += ["--", "set", "bridge", sw.name, "protocols=OpenFlow13", "--", "del-controller", sw.name]
+        add += ["--", "set-controller", sw.name, f"tcp:{controller_ip}:{of_port}"]
+    # Force reconnect (important if the initial handshake happened before protocols were restricted):
+    # the delete must commit on its own, vswitchd keeps a connection whose target survives a transaction.
+    net.switches[0].cmd("ovs-vsctl " + " ".join(drop))
+    net.switches[0].cmd("ovs-vsctl " + " ".join(add))
+
+def host_bindings(net):
+    """MAC/IP/attachment (dpid, port) of every host, read from the Mininet objects."""
+    out = []
+    for h in net.hosts:
+        intf = h.defaultIntf()
+        link = intf.link
+        peer = link.intf2 if link.intf1 is intf else link.intf1
+        sw = peer.node
+        out.append({"host": h.name, "mac": h.MAC(), "ip": h.IP(),
+                    "dpid": int(sw.dpid, 16), "port": int(sw.ports[peer])})
+    return out
+
+def static_arp(net):
+    """Install full static ARP tables; one batched shell command per host, run concurrently."""
+    for h in net.hosts:
+        cmds = [f"arp -s {o.IP()} {o.MAC()}" for o in net.hosts if o is not h]
+        h.sendCmd("; ".join(cmds) if cmds else "true")
+    for h in net.hosts:
+        h.waitOutput()
+
+def n_fabric_links(net) -> int:
+    """Directed switch-to-switch links, as the controller counts them."""
+    names = {sw.name for sw in net.switches}
+    return 2 * sum(1 for lk in net.links
+                   if lk.intf1.node.name in names and lk.intf2.node.name in names)
+
+def wait_for_controller_topology(rest, n_switches, n_links, timeout_s=15.0, poll_s=0.1) -> bool:
+    """Poll /sdnppo/topology until LLDP discovery has seen every switch and fabric link."""
+    t0 = time.time()
+    while time.time() - t0 < timeout_s:
+        try:
+            t = http_get(rest + "/sdnppo/topology", timeout=1.0)
+            if int(t.get("switches", 0)) >= n_switches and int(t.get("links", 0)) >= n_links:
+                return True
+        except Exception:
+            pass
+        time.sleep(poll_s)
+    return False
+
+def fast_start(net, args, rest, timer):
+    """Startup without pingAll or fixed sleeps: single OVS transaction, pushed host
+    bindings + static ARP instead of broadcast warm-up, polled readiness checks."""
+    with timer.phase("ovs_config"):
+        configure_switches(net, args.controller_ip, args.of_port)
+    with timer.phase("ovs_connect"):
+        ok = wait_for_ovs_controllers(net, timeout_s=10.0, poll_s=0.05)
+    if not ok:
+        print("[error] OVS->controller connection failed; aborting run (check SDNPPO_OF_PORT / controller process).")
+        report_controller_failure(net)
+        net.stop()
+        raise SystemExit(2)
+    with timer.phase("ctrl_topology"):
+        if not wait_for_controller_topology(rest, len(net.switches), n_fabric_links(net)):
+            print("[warn] controller has not discovered the full topology yet")
+    with timer.phase("host_bindings"):
+        try:
+            http_post(rest + "/sdnppo/hosts", {"hosts": host_bindings(net)})
+            pushed = True
+        except Exception:
+            pushed = False
+    if not pushed:
+        print("[warn] controller rejected host bindings; falling back to pingAll warm-up")
+        with timer.phase("pingall"):
+            net.pingAll(timeout=1)
+    with timer.phase("static_arp"):
+        static_arp(net)
+
 def http_get(url, timeout=2.0):
     req = Request(url, method="GET")
     with urlopen(req, timeout=timeout) as r:
@@ -54,15 +143,39 @@ def reward_proxy(st):
     drop_pen = min(1.0, drop * 20.0)
     return float(1.0 * thr_term - 1.2 * cong_pen - 1.5 * drop_pen)
 
-def topo(name, bw, delay):
+TOPOS = ["leafspine", "wan", "fattree", "randwan"]
+
+def topo(name, bw, delay, **params):
     if name == "leafspine":
-        return LeafSpine(bw=bw, delay=delay)
+        return LeafSpine(bw=bw, delay=delay, **params)
     if name == "wan":
         return MiniWAN(bw=bw, delay=delay)
     if name == "fattree":
-        return FatTreeK4(bw=bw, delay=delay)
+        k = int(params.get("k", 4))
+        return FatTreeK4(bw=bw, delay=delay) if k == 4 else FatTree(bw=bw, delay=delay, k=k)
+    if name == "randwan":
+        return RandomWAN(bw=bw, delay=delay, **params)
     raise ValueError(name)
 
+def add_topo_args(ap):
+    ap.add_argument("--k", type=int, default=4, help="fattree: pods/ports per switch (even)")
+    ap.add_argument("--spines", type=int, default=2, help="leafspine")
+    ap.add_argument("--leaves", type=int, default=4, help="leafspine")
+    ap.add_argument("--hosts_per_leaf", type=int, default=2, help="leafspine")
+    ap.add_argument("--wan_nodes", type=int, default=6, help="randwan")
+    ap.add_argument("--wan_degree", type=float, default=3.0, help="randwan: mean router degree")
+    ap.add_argument("--topo_seed", type=int, default=1, help="randwan")
+
+def topo_params(name, args):
+    """Generator keyword arguments for topo() from add_topo_args() options."""
+    if name == "leafspine":
+        return {"spines": args.spines, "leaves": args.leaves, "hosts_per_leaf": args.hosts_per_leaf}
+    if name == "fattree":
+        return {"k": args.k}
+    if name == "randwan":
+        return {"nodes": args.wan_nodes, "degree": args.wan_degree, "seed": args.topo_seed}
+    return {}
+
 def policy(name):
     if name == "util_guard":
         return policies.util_guard
@@ -74,86 +187,123 @@ def policy(name):
         return None
     raise ValueError(name)
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--topo", choices=["leafspine", "wan", "fattree"], default="leafspine")
-    ap.add_argument("--policy", choices=["util_guard", "const50", "rr", "external"], default="util_guard")
-    ap.add_argument("--controller_ip", default="127.0.0.1")
-    ap.add_argument("--of_port", type=int, default=6653)
-    ap.add_argument("--rest_port", type=int, default=8080)
-    ap.add_argument("--duration_s", type=int, default=480)
-    ap.add_argument("--step_s", type=float, default=2.0)
-    ap.add_argument("--bw", type=int, default=20)
-    ap.add_argument("--delay", default="1ms")
-    ap.add_argument("--seed", type=int, default=1)
-    args = ap.parse_args()
-    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + f"_{args.topo}_{args.policy}_seed{args.seed}"
-    outdir = os.path.join("logs", run_id)
-    os.makedirs(outdir, exist_ok=True)
-    os.makedirs(os.path.join(outdir, "iperf3"), exist_ok=True)
+def write_profile(outdir, timer, step_s, prof=None):
+    """timings.json (phases + per-event stats) and a readable summary.txt; profile.pstats with cProfile."""
+    periods = timer.samples.get("step_period", [])
+    late = sum(1 for p in periods if p > 1.05 * step_s)
+    timer.write_json(os.path.join(outdir, "timings.json"), step_s=step_s, late_steps=late)
+    text = timer.summary() + f"\n\n  steps later than 1.05 x step_s: {late}/{len(periods)}\n"
+    if prof is not None:
+        import io
+        import pstats
+        prof.disable()
+        prof.dump_stats(os.path.join(outdir, "profile.pstats"))
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+        text += "\ncProfile (main thread, top 40 by cumulative time):\n" + buf.getvalue()
+    with open(os.path.join(outdir, "summary.txt"), "w") as f:
+        f.write(text)
+    print(f"[profile] {os.path.join(outdir, 'timings.json')}")
+    print(timer.summary())
 
-    net = Mininet(
-        topo=topo(args.topo, args.bw, args.delay),
-        controller=None,
-        switch=OVSSwitch,
-        link=TCLink,
-        autoSetMacs=True,
-        autoStaticArp=False,
-        build=True,
-    )
-    net.addController(RemoteController("c0", ip=args.controller_ip, port=args.of_port))
-    net.start()
-    for sw in net.switches:
-        sw.cmd(f"ovs-vsctl set bridge {sw.name} protocols=OpenFlow13")
-        # Force reconnect (important if the initial handshake happened before protocols were restricted)
-        sw.cmd(f"ovs-vsctl del-controller {sw.name}")
-        sw.cmd(f"ovs-vsctl set-controller {sw.name} tcp:{args.controller_ip}:{args.of_port}")
+def setup(args, rest, timer):
+    """Build and start the Mininet network, connect OVS to the controller, warm up, start iperf3 servers."""
+    with timer.phase("build"):
+        net = Mininet(
+            topo=topo(args.topo, args.bw, args.delay, **topo_params(args.topo, args)),
+            controller=None,
+            switch=OVSSwitch,
+            link=TCLink,
+            autoSetMacs=True,
+            autoStaticArp=False,
+            build=True,
+        )
+        net.addController(RemoteController("c0", ip=args.controller_ip, port=args.of_port))
+    with timer.phase("net_start"):
+        net.start()
 
-    time.sleep(1.0)
-    if not wait_for_ovs_controllers(net, timeout_s=10.0, poll_s=0.5):
-        print("[error] OVS->controller connection failed; aborting run (check SDNPPO_OF_PORT / controller process).")
-        for sw in net.switches:
-            tgt = sw.cmd(f"ovs-vsctl get Controller {sw.name} target").strip()
-            isc = sw.cmd(f"ovs-vsctl get Controller {sw.name} is_connected").strip()
-            print(f"  {sw.name}: target={tgt} is_connected={isc}")
-        net.stop()
-        raise SystemExit(2)
+    if args.fast_start:
+        fast_start(net, args, rest, timer)
+    else:
+        with timer.phase("ovs_config"):
+            for sw in net.switches:
+                sw.cmd(f"ovs-vsctl set bridge {sw.name} protocols=OpenFlow13")
+                # Force reconnect (important if the initial handshake happened before protocols were restricted)
+                sw.cmd(f"ovs-vsctl del-controller {sw.name}")
+                sw.cmd(f"ovs-vsctl set-controller {sw.name} tcp:{args.controller_ip}:{args.of_port}")
 
-    loss = net.pingAll(timeout=1)
-    if loss > 0:
-        print(f"[error] pingAll loss={loss}% at startup; aborting.")
-        net.stop()
-        raise SystemExit(3)
+        with timer.phase("ovs_connect"):
+            time.sleep(1.0)
+            ok = wait_for_ovs_controllers(net, timeout_s=10.0, poll_s=0.5)
+        if not ok:
+            print("[error] OVS->controller connection failed; aborting run (check SDNPPO_OF_PORT / controller process).")
+            report_controller_failure(net)
+            net.stop()
+            raise SystemExit(2)
 
-    for sw in net.switches:
-        sw.cmd("ovs-vsctl set bridge %s protocols=OpenFlow13" % sw.name)
+        with timer.phase("pingall"):
+            loss = net.pingAll(timeout=1)
+        if loss > 0:
+            print(f"[error] pingAll loss={loss}% at startup; aborting.")
+            net.stop()
+            raise SystemExit(3)
 
-    # Give OVS a moment to (re)connect after enforcing OF1.3, then warm up ARP/host learning.
-    time.sleep(1.0)
-    if not wait_for_ovs_controllers(net, timeout_s=10.0, poll_s=0.5):
-        print("[warn] some switches report controller is_connected=false (check OF port / firewall)")
-    try:
-        net.pingAll(timeout=1)
-    except Exception:
-        pass
+        with timer.phase("ovs_reconnect"):
+            for sw in net.switches:
+                sw.cmd("ovs-vsctl set bridge %s protocols=OpenFlow13" % sw.name)
 
-    start_iperf_servers(net, outdir=os.path.join(outdir, "iperf3_servers"))
+            # Give OVS a moment to (re)connect after enforcing OF1.3, then warm up ARP/host learning.
+            time.sleep(1.0)
+            if not wait_for_ovs_controllers(net, timeout_s=10.0, poll_s=0.5):
+                print("[warn] some switches report controller is_connected=false (check OF port / firewall)")
+        with timer.phase("pingall_warmup"):
+            try:
+                net.pingAll(timeout=1)
+            except Exception:
+                pass
+
+    with timer.phase("iperf_servers"):
+        start_iperf_servers(net, outdir=os.path.join(args.outdir, "iperf3_servers"), parallel=args.fast_start)
+        if args.fast_start and not wait_for_iperf_servers(net):
+            print("[warn] not all iperf3 servers are listening")
 
-    rest = f"http://{args.controller_ip}:{args.rest_port}"
     try:
         http_post(rest + "/sdnppo/reset", {})
     except Exception:
         pass
+    return net
+
+def flush_flows(net):
+    """Delete the controller-installed IPv4 flows on every bridge (table-miss, meters and groups stay)."""
+    cmds = [f"ovs-ofctl -O OpenFlow13 del-flows {sw.name} ip" for sw in net.switches]
+    net.switches[0].cmd("; ".join(cmds))
+
+def reset_episode(net, args, rest, timer):
+    """Between episodes: stop leftover iperf3 clients, reset controller metrics, optionally flush flows."""
+    with timer.phase("episode_reset"):
+        # Hosts share the PID namespace: one pkill reaches every host's clients; servers (-s) keep running.
+        net.hosts[0].cmd('pkill -f "iperf3 -c" >/dev/null 2>&1 || true')
+        if args.flush_flows:
+            flush_flows(net)
+        try:
+            http_post(rest + "/sdnppo/reset", {})
+        except Exception:
+            print("[warn] POST /sdnppo/reset failed between episodes")
 
+def run_episode(net, args, rest, outdir, run_id, seed, timer):
+    """One episode: traffic thread + step loop; writes steps.csv, ryu_state.jsonl, flows.csv into outdir."""
+    import threading
+    os.makedirs(os.path.join(outdir, "iperf3"), exist_ok=True)
     pol = policy(args.policy)
     external = (args.policy == "external")
 
-    import threading
     flow_specs = []
     def traffic_job():
         nonlocal flow_specs
-        flow_specs = run_traffic(net, duration_s=args.duration_s, outdir=outdir, seed=args.seed)
-    threading.Thread(target=traffic_job, daemon=True).start()
+        flow_specs = run_traffic(net, duration_s=args.duration_s, outdir=outdir, seed=seed,
+                                 timer=timer if args.profile else None)
+    traffic = threading.Thread(target=traffic_job, daemon=True)
+    traffic.start()
 
     steps_path = os.path.join(outdir, "steps.csv")
     state_path = os.path.join(outdir, "ryu_state.jsonl")
@@ -169,10 +319,16 @@ def main():
     u_prev = 0.5
     n_steps = int(args.duration_s / args.step_s)
 
+    t_prev = None
     for step_idx in range(n_steps + 1):
         ts = time.time()
+        t_iter = time.perf_counter()
+        if t_prev is not None:
+            timer.record("step_period", t_iter - t_prev)
+        t_prev = t_iter
         try:
-            st = http_get(rest + "/sdnppo/state")
+            with timer.sample("step_get_state"):
+                st = http_get(rest + "/sdnppo/state")
         except Exception:
             st = {"mean_util":0.0,"max_util":0.0,"drop_rate":0.0,"throughput_mbps":0.0,"active_flows":0,"u":u_prev}
 
@@ -209,27 +365,87 @@ def main():
             u = float(pol(st, step_idx, prev_u=u_prev))
             u_prev = u
             try:
-                http_post(rest + "/sdnppo/action", {"u": u})
+                with timer.sample("step_post_action"):
+                    http_post(rest + "/sdnppo/action", {"u": u})
             except Exception:
                 pass
 
         r = reward_proxy(st)
         prev_s, prev_a, prev_r, prev_ts = s, u, r, ts
+        timer.record("step_work", time.perf_counter() - t_iter)
         time.sleep(args.step_s)
 
     f_steps.close()
     f_state.close()
-    os.makedirs(os.path.dirname(flows_path), exist_ok=True)
-    with flows_path.open("w", newline="") as f:
+    # run_traffic stops launching at duration_s and then waits <= 5 s for its clients.
+    traffic.join(timeout=10.0)
+    with open(flows_path, "w", newline="") as f:
         wf = csv.writer(f)
         wf.writerow(["flow_id","src","dst","dst_ip","dst_port","proto","rate_mbps","duration_s","flow_type","start_ts"])
         for fs in flow_specs:
             wf.writerow([fs.flow_id, fs.src, fs.dst, fs.dst_ip, fs.dst_port, fs.proto,
                          fs.rate_mbps, fs.duration_s, fs.flow_type, fs.start_ts])
+    return steps_path
 
-    net.stop()
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topo", choices=TOPOS, default="leafspine")
+    ap.add_argument("--policy", choices=["util_guard", "const50", "rr", "external"], default="util_guard")
+    ap.add_argument("--controller_ip", default="127.0.0.1")
+    ap.add_argument("--of_port", type=int, default=6653)
+    ap.add_argument("--rest_port", type=int, default=8080)
+    ap.add_argument("--duration_s", type=int, default=480)
+    ap.add_argument("--step_s", type=float, default=2.0)
+    ap.add_argument("--bw", type=int, default=20)
+    ap.add_argument("--delay", default="1ms")
+    ap.add_argument("--seed", type=int, default=1)
+    add_topo_args(ap)
+    ap.add_argument("--fast_start", action="store_true",
+                    help="skip pingAll/fixed sleeps: push host bindings to the controller, start iperf3 servers in parallel")
+    ap.add_argument("--profile", nargs="?", const="timers", choices=["timers", "cprofile"], default=None,
+                    help="write logs/<run_id>/timings.json + summary.txt (step-loop and iperf3 launch timers); "
+                         "cprofile also samples the main thread")
+    ap.add_argument("--episodes", type=int, default=1,
+                    help="episodes on one network; N > 1 logs each to logs/<run_id>/epNNN with seed + ep")
+    ap.add_argument("--flush_flows", action="store_true", help="delete installed IPv4 flows between episodes")
+    args = ap.parse_args()
+    prof = None
+    if args.profile == "cprofile":
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S") + f"_{args.topo}_{args.policy}_seed{args.seed}"
+    args.outdir = os.path.join("logs", run_id)
+    os.makedirs(args.outdir, exist_ok=True)
+
+    rest = f"http://{args.controller_ip}:{args.rest_port}"
+    timer = PhaseTimer()
+    net = setup(args, rest, timer)
+
+    timer.write_json(os.path.join(args.outdir, "startup.json"))
+    print(f"[startup] {'fast' if args.fast_start else 'default'} path breakdown:")
+    print(timer.summary())
+
+    steps_paths = []
+    for ep in range(args.episodes):
+        if ep > 0:
+            reset_episode(net, args, rest, timer)
+        if args.episodes > 1:
+            outdir = os.path.join(args.outdir, f"ep{ep:03d}")
+            ep_id = f"{run_id}_ep{ep:03d}"
+            print(f"[episode {ep + 1}/{args.episodes}] seed={args.seed + ep} -> {outdir}")
+        else:
+            outdir, ep_id = args.outdir, run_id
+        with timer.phase(f"episode_{ep:03d}"):
+            steps_paths.append(run_episode(net, args, rest, outdir, ep_id, args.seed + ep, timer))
+
+    with timer.phase("net_stop"):
+        net.stop()
+    if args.profile:
+        write_profile(args.outdir, timer, args.step_s, prof)
     print("DONE")
-    print("steps.csv:", steps_path)
+    for p in steps_paths:
+        print("steps.csv:", p)
 
 if __name__ == "__main__":
     main()
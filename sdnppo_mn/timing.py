@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Phase and per-event wall-clock timers for run_experiment.
+
+PhaseTimer.phase() times one-off startup phases; sample()/record() collect
+repeated events (per-step HTTP calls, iperf3 client launches) summarized as
+n/mean/percentiles. Compare runs of a sweep:
+  python3 -m sdnppo_mn.timing logs/*/timings.json
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+def _pct(xs: List[float], q: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(q * (len(xs) - 1) + 0.5))] if xs else 0.0
+
+class PhaseTimer:
+    """Wall-clock breakdown of named phases (e.g. Mininet build, OVS connect, warm-up)."""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - t0))
+
+    @contextmanager
+    def sample(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - t0)
+
+    def record(self, name: str, seconds: float):
+        self.samples[name].append(seconds)
+
+    def total(self) -> float:
+        return sum(s for _, s in self.phases)
+
+    def sample_stats(self):
+        out = {}
+        for name, xs in list(self.samples.items()):
+            xs = list(xs)
+            out[name] = {
+                "n": len(xs),
+                "total_s": round(sum(xs), 6),
+                "mean_ms": round(1e3 * sum(xs) / max(1, len(xs)), 3),
+                "p50_ms": round(1e3 * _pct(xs, 0.50), 3),
+                "p95_ms": round(1e3 * _pct(xs, 0.95), 3),
+                "p99_ms": round(1e3 * _pct(xs, 0.99), 3),
+                "max_ms": round(1e3 * max(xs, default=0.0), 3),
+            }
+        return out
+
+    def as_dict(self):
+        d = {
+            "phases": [{"name": n, "s": round(s, 6)} for n, s in self.phases],
+            "total_s": round(self.total(), 6),
+        }
+        if self.samples:
+            d["samples"] = self.sample_stats()
+        return d
+
+    def summary(self) -> str:
+        tot = max(1e-9, self.total())
+        w = max([len(n) for n, _ in self.phases] + [5])
+        lines = [f"  {n:<{w}}  {s:8.3f}s  {100.0 * s / tot:5.1f}%" for n, s in self.phases]
+        lines.append(f"  {'total':<{w}}  {self.total():8.3f}s")
+        if self.samples:
+            stats = self.sample_stats()
+            w = max(len(n) for n in stats)
+            lines.append("")
+            lines.append(f"  {'event':<{w}}  {'n':>6} {'mean_ms':>9} {'p50_ms':>9} {'p99_ms':>9} {'max_ms':>9}")
+            for n, st in stats.items():
+                lines.append(f"  {n:<{w}}  {st['n']:>6} {st['mean_ms']:>9.2f} {st['p50_ms']:>9.2f} "
+                             f"{st['p99_ms']:>9.2f} {st['max_ms']:>9.2f}")
+        return "\n".join(lines)
+
+    def write_json(self, path: str, **extra):
+        with open(path, "w") as f:
+            json.dump({**self.as_dict(), **extra}, f, indent=2)
+
+def main():
+    ap = argparse.ArgumentParser(description="compare timings.json files across runs")
+    ap.add_argument("paths", nargs="+")
+    ap.add_argument("--events", default="step_get_state,step_post_action,iperf_client_launch",
+                    help="sample events whose p99 to show")
+    args = ap.parse_args()
+
+    rows = []
+    for p in args.paths:
+        with open(p) as f:
+            rows.append((p, json.load(f)))
+    phases = []
+    for _, d in rows:
+        for ph in d.get("phases", []):
+            if ph["name"] not in phases:
+                phases.append(ph["name"])
+    events = [e for e in args.events.split(",") if e]
+    head = ["run", "phases_s"] + phases + [f"{e}_p99ms" for e in events] + ["late_steps"]
+    print("\t".join(head))
+    for p, d in rows:
+        ph = {x["name"]: x["s"] for x in d.get("phases", [])}
+        sm = d.get("samples", {})
+        vals = [p, f"{d.get('total_s', 0.0):.3f}"] + [f"{ph.get(n, 0.0):.3f}" for n in phases]
+        vals += [f"{sm.get(e, {}).get('p99_ms', 0.0):.2f}" for e in events]
+        vals.append(str(d.get("late_steps", "")))
+        print("\t".join(vals))
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,46 @@
 # -*- coding: utf-8 -*-
 from mininet.topo import Topo
 
-class FatTreeK4(Topo):
-    def build(self, bw=20, delay="1ms"):
-        k = 4
+from .dpid import hex_width, make_dpid
+
+class FatTree(Topo):
+    """k-ary fat-tree (k even): (k/2)^2 cores, k pods of k/2 agg + k/2 edge switches, k^3/4 hosts.
+
+    DPIDs are 0x3<idx> (core), 0x4<pod><idx> (agg), 0x5<pod><idx> (edge) with
+    field widths fixed by k. Names keep the compact a<pod><i> form while every
+    index is a single digit and switch to a<pod>_<i> beyond that.
+    """
+
+    def build(self, bw=20, delay="1ms", k=4):
+        k = int(k)
+        if k < 2 or k % 2:
+            raise ValueError(f"fat-tree k must be even and >= 2, got {k}")
         pods = k
-        core = [self.addSwitch(f"c{i+1}", dpid=f"{(0x300+i+1):016x}") for i in range((k//2)**2)]
+        half = k // 2
+        pw = hex_width(pods - 1)
+        iw = hex_width(max(half * half, half))
+        sep = "" if pods <= 9 and half <= 9 else "_"
+
+        core = [self.addSwitch(f"c{i+1}", dpid=make_dpid(0x3, (0, pw), (i + 1, iw))) for i in range(half * half)]
         agg, edge = [], []
         for p in range(pods):
-            agg_p = [self.addSwitch(f"a{p+1}{i+1}", dpid=f"{(0x400 + p*0x10 + i+1):016x}") for i in range(k//2)]
-            edge_p = [self.addSwitch(f"e{p+1}{i+1}", dpid=f"{(0x500 + p*0x10 + i+1):016x}") for i in range(k//2)]
+            agg_p = [self.addSwitch(f"a{p+1}{sep}{i+1}", dpid=make_dpid(0x4, (p, pw), (i + 1, iw))) for i in range(half)]
+            edge_p = [self.addSwitch(f"e{p+1}{sep}{i+1}", dpid=make_dpid(0x5, (p, pw), (i + 1, iw))) for i in range(half)]
             agg.append(agg_p); edge.append(edge_p)
             for a in agg_p:
                 for e in edge_p:
                     self.addLink(a, e, bw=bw, delay=delay)
             for ei, e in enumerate(edge_p):
-                for h in range(k//2):
-                    host = self.addHost(f"h{p+1}{ei+1}{h+1}")
+                for h in range(half):
+                    host = self.addHost(f"h{p+1}{sep}{ei+1}{sep}{h+1}")
                     self.addLink(e, host, bw=bw, delay=delay)
         idx = 0
-        for g in range(k//2):
-            for j in range(k//2):
+        for g in range(half):
+            for j in range(half):
                 c = core[idx]; idx += 1
                 for p in range(pods):
                     self.addLink(c, agg[p][g], bw=bw, delay=delay)
+
+class FatTreeK4(FatTree):
+    def build(self, bw=20, delay="1ms"):
+        super().build(bw=bw, delay=delay, k=4)
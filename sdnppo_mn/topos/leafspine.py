@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 from mininet.topo import Topo
 
+from .dpid import hex_width, make_dpid
+
 class LeafSpine(Topo):
     def build(self, bw=20, delay="1ms", spines=2, leaves=4, hosts_per_leaf=2):
-        sp = [self.addSwitch(f"s{i+1}", dpid=f"{(i+1):016x}") for i in range(spines)]
-        lf = [self.addSwitch(f"l{i + 1}", dpid=f"{(0x100 + i + 1):016x}") for i in range(leaves)]
+        # spine = 0x0<idx>, leaf = 0x1<idx>; the index field grows past two hex digits only when needed
+        w = hex_width(max(spines, leaves), minimum=2)
+        sp = [self.addSwitch(f"s{i+1}", dpid=make_dpid(0x0, (i + 1, w))) for i in range(spines)]
+        lf = [self.addSwitch(f"l{i + 1}", dpid=make_dpid(0x1, (i + 1, w))) for i in range(leaves)]
         for s in sp:
             for l in lf:
                 self.addLink(s, l, bw=bw, delay=delay)
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import random
+
 from mininet.topo import Topo
 
+from .dpid import hex_width, make_dpid
+
 class MiniWAN(Topo):
     def build(self, bw=20, delay="5ms"):
         r = [self.addSwitch(f"r{i+1}", dpid=f"{(0x200+i+1):016x}") for i in range(6)]
@@ -10,3 +14,25 @@ class MiniWAN(Topo):
         for i, sw in enumerate(r):
             h = self.addHost(f"h{i+1}")
             self.addLink(sw, h, bw=bw, delay=delay)
+
+class RandomWAN(Topo):
+    """Seeded random WAN: a ring (always connected) plus random chords up to the
+    requested mean degree, one host per router. DPIDs are 0x2<idx> like MiniWAN."""
+
+    def build(self, bw=20, delay="5ms", nodes=6, degree=3.0, seed=1):
+        n = int(nodes)
+        if n < 3:
+            raise ValueError(f"random WAN needs at least 3 nodes, got {n}")
+        w = hex_width(n, minimum=2)
+        r = [self.addSwitch(f"r{i+1}", dpid=make_dpid(0x2, (i + 1, w))) for i in range(n)]
+        edges = {(i, (i + 1) % n) if i < (i + 1) % n else ((i + 1) % n, i) for i in range(n)}
+        want = min(n * (n - 1) // 2, max(n, int(round(n * float(degree) / 2.0))))
+        rng = random.Random(seed)
+        while len(edges) < want:
+            u, v = rng.sample(range(n), 2)
+            edges.add((min(u, v), max(u, v)))
+        for u, v in sorted(edges):
+            self.addLink(r[u], r[v], bw=bw, delay=delay)
+        for i, sw in enumerate(r):
+            h = self.addHost(f"h{i+1}")
+            self.addLink(sw, h, bw=bw, delay=delay)
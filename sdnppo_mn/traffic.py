@@ -2,6 +2,7 @@
 import os
 import random
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass
 from typing import List, Optional, Tuple
 
@@ -23,14 +24,15 @@ class FlowSpec:
     start_ts: float
 
 class PortPool:
-    def __init__(self, ports: List[int]):
+    def __init__(self, ports: List[int], rng=random):
         self.ports = ports
         self.free = set(ports)
+        self.rng = rng
 
     def acquire(self) -> Optional[int]:
         if not self.free:
             return None
-        p = random.choice(list(self.free))
+        p = self.rng.choice(list(self.free))
         self.free.remove(p)
         return p
 
@@ -38,31 +40,85 @@ class PortPool:
         if port in self.ports:
             self.free.add(port)
 
-def start_iperf_servers(net, outdir="logs/iperf3_servers"):
+def start_iperf_servers(net, outdir="logs/iperf3_servers", parallel=False):
+    """Start one iperf3 daemon per host x class port.
+
+    Mininet hosts share the PID namespace, so stale servers are killed once up
+    front (a per-host pkill would also kill the daemons of hosts started earlier).
+    With parallel=True every host shell gets its whole command batch at once and
+    readiness is left to wait_for_iperf_servers() instead of a fixed sleep.
+    """
     os.makedirs(outdir, exist_ok=True)
+    ports = sorted(set(MICE_PORTS + ELE_PORTS + SHOCK_PORTS))
+    if net.hosts:
+        net.hosts[0].cmd('pkill -f "iperf3 -s" >/dev/null 2>&1 || true')
+    if not parallel:
+        for h in net.hosts:
+            for p in ports:
+                logfile = os.path.join(outdir, f"{h.name}_p{p}.log")
+                h.cmd(f"iperf3 -s -p {p} -D --logfile {logfile}")
+        time.sleep(0.5)
+        return
+    for h in net.hosts:
+        cmds = [f"iperf3 -s -p {p} -D --logfile {os.path.join(outdir, f'{h.name}_p{p}.log')}" for p in ports]
+        h.sendCmd("; ".join(cmds))
     for h in net.hosts:
-        h.cmd('pkill -f "iperf3 -s" >/dev/null 2>&1 || true')
-        for p in set(MICE_PORTS + ELE_PORTS + SHOCK_PORTS):
-            logfile = os.path.join(outdir, f"{h.name}_p{p}.log")
-            h.cmd(f"iperf3 -s -p {p} -D --logfile {logfile}")
-    time.sleep(0.5)
-
-def choose_pair(hosts) -> Tuple:
-    src = random.choice(hosts)
-    dst = random.choice(hosts)
+        h.waitOutput()
+
+def wait_for_iperf_servers(net, timeout_s: float = 5.0, poll_s: float = 0.05) -> bool:
+    """Poll every host (concurrently) until all iperf3 class ports are listening."""
+    want = set(MICE_PORTS + ELE_PORTS + SHOCK_PORTS)
+    pending = list(net.hosts)
+    t0 = time.time()
+    while pending and time.time() - t0 < timeout_s:
+        for h in pending:
+            h.sendCmd("ss -ltnH")
+        still = []
+        for h in pending:
+            out = h.waitOutput()
+            listening = set()
+            for line in out.splitlines():
+                cols = line.split()
+                if len(cols) >= 4 and ":" in cols[3]:
+                    try:
+                        listening.add(int(cols[3].rsplit(":", 1)[1]))
+                    except ValueError:
+                        pass
+            if not want <= listening:
+                still.append(h)
+        pending = still
+        if pending:
+            time.sleep(poll_s)
+    return not pending
+
+def choose_pair(hosts, rng=random) -> Tuple:
+    src = rng.choice(hosts)
+    dst = rng.choice(hosts)
     while dst == src:
-        dst = random.choice(hosts)
+        dst = rng.choice(hosts)
     return src, dst
 
-def schedule(now_ts, next_mice, next_ele, next_shock, mice_int, ele_int, shock_int):
+def schedule(now_ts, next_mice, next_ele, next_shock, mice_int, ele_int, shock_int, rng=random):
     do_m = now_ts >= next_mice
     do_e = now_ts >= next_ele
     do_s = now_ts >= next_shock
-    if do_m: next_mice = now_ts + random.uniform(*mice_int)
-    if do_e: next_ele  = now_ts + random.uniform(*ele_int)
-    if do_s: next_shock= now_ts + random.uniform(*shock_int)
+    if do_m: next_mice = now_ts + rng.uniform(*mice_int)
+    if do_e: next_ele  = now_ts + rng.uniform(*ele_int)
+    if do_s: next_shock= now_ts + rng.uniform(*shock_int)
     return do_m, do_e, do_s, next_mice, next_ele, next_shock
 
+def pool_key(ftype: str) -> str:
+    return "mice" if ftype == "mice" else ("elephant" if ftype == "elephant" else "shock")
+
+def draw_size(ftype: str, mice_dur, ele_dur, mice_rate, ele_rate, rng=random) -> Tuple[int, float]:
+    if ftype == "mice":
+        dur = rng.randint(*mice_dur); rate = rng.uniform(*mice_rate)
+    elif ftype == "elephant":
+        dur = rng.randint(*ele_dur); rate = rng.uniform(*ele_rate)
+    else:
+        dur = rng.randint(10, 20); rate = rng.uniform(max(ele_rate[1], 6), 10)
+    return int(dur), float(rate)
+
 def launch(src_host, dst_ip, dst_port, rate_mbps, duration_s, json_path):
     os.makedirs(os.path.dirname(json_path), exist_ok=True)
     cmd = ["iperf3","-c",dst_ip,"-p",str(dst_port),"-u","-t",str(duration_s),
@@ -74,52 +130,50 @@ def run_traffic(net, duration_s: int, outdir: str,
                 mice_rate=(1,2), ele_rate=(2,6),
                 mice_interval=(5,15), ele_interval=(30,120),
                 shock_interval=(90,180),
-                seed: int = 1):
+                seed: int = 1, timer=None):
+    # module-level random stays seeded for the policies (util_guard noise); traffic draws
+    # use their own generator so the main thread's draws cannot reorder them
     random.seed(seed)
+    rng = random.Random(seed)
     os.makedirs(outdir, exist_ok=True)
 
     pools = {}
     for h in net.hosts:
         pools[h.name] = {
-            "mice": PortPool(MICE_PORTS),
-            "elephant": PortPool(ELE_PORTS),
-            "shock": PortPool(SHOCK_PORTS),
+            "mice": PortPool(MICE_PORTS, rng),
+            "elephant": PortPool(ELE_PORTS, rng),
+            "shock": PortPool(SHOCK_PORTS, rng),
         }
 
     active = {}
     specs: List[FlowSpec] = []
 
     start = time.time()
-    next_m = start + random.uniform(*mice_interval)
-    next_e = start + random.uniform(*ele_interval)
-    next_s = start + random.uniform(*shock_interval)
+    next_m = start + rng.uniform(*mice_interval)
+    next_e = start + rng.uniform(*ele_interval)
+    next_s = start + rng.uniform(*shock_interval)
 
     fid = 0
     while time.time() - start < duration_s:
         now = time.time()
         do_m, do_e, do_s, next_m, next_e, next_s = schedule(
-            now, next_m, next_e, next_s, mice_interval, ele_interval, shock_interval
+            now, next_m, next_e, next_s, mice_interval, ele_interval, shock_interval, rng
         )
 
         def make(ftype: str):
             nonlocal fid
-            src, dst = choose_pair(net.hosts)
-            key = "mice" if ftype == "mice" else ("elephant" if ftype == "elephant" else "shock")
-            p = pools[dst.name][key].acquire()
+            src, dst = choose_pair(net.hosts, rng)
+            p = pools[dst.name][pool_key(ftype)].acquire()
             if p is None:
                 return
             fid += 1
-            if ftype == "mice":
-                dur = random.randint(*mice_dur); rate = random.uniform(*mice_rate)
-            elif ftype == "elephant":
-                dur = random.randint(*ele_dur); rate = random.uniform(*ele_rate)
-            else:
-                dur = random.randint(10, 20); rate = random.uniform(max(ele_rate[1], 6), 10)
+            dur, rate = draw_size(ftype, mice_dur, ele_dur, mice_rate, ele_rate, rng)
 
             spec = FlowSpec(f"f{fid:06d}", src.name, dst.name, dst.IP(), p, "udp",
                             float(rate), int(dur), ftype, now)
             jpath = os.path.join(outdir, "iperf3", f"{spec.flow_id}.json")
-            proc = launch(src, spec.dst_ip, spec.dst_port, spec.rate_mbps, spec.duration_s, jpath)
+            with (timer.sample("iperf_client_launch") if timer is not None else nullcontext()):
+                proc = launch(src, spec.dst_ip, spec.dst_port, spec.rate_mbps, spec.duration_s, jpath)
             active[spec.flow_id] = (proc, spec)
             specs.append(spec)
 
@@ -131,8 +185,7 @@ def run_traffic(net, duration_s: int, outdir: str,
         done = []
         for fid_, (proc, spec) in active.items():
             if proc.poll() is not None:
-                key = "mice" if spec.flow_type == "mice" else ("elephant" if spec.flow_type == "elephant" else "shock")
-                pools[spec.dst][key].release(spec.dst_port)
+                pools[spec.dst][pool_key(spec.flow_type)].release(spec.dst_port)
                 done.append(fid_)
         for fid_ in done:
             active.pop(fid_, None)
@@ -145,11 +198,75 @@ def run_traffic(net, duration_s: int, outdir: str,
         done = []
         for fid_, (proc, spec) in active.items():
             if proc.poll() is not None:
-                key = "mice" if spec.flow_type == "mice" else ("elephant" if spec.flow_type == "elephant" else "shock")
-                pools[spec.dst][key].release(spec.dst_port)
+                pools[spec.dst][pool_key(spec.flow_type)].release(spec.dst_port)
                 done.append(fid_)
         for fid_ in done:
             active.pop(fid_, None)
         time.sleep(0.2)
 
     return specs
+
+def synth_trace(hosts: List[Tuple[str, str]], duration_s: int,
+                mice_dur=(2,5), ele_dur=(20,60),
+                mice_rate=(1,2), ele_rate=(2,6),
+                mice_interval=(5,15), ele_interval=(30,120),
+                shock_interval=(90,180),
+                seed: int = 1, tick_s: float = 0.2) -> List[FlowSpec]:
+    """Flow trace statistically equivalent to what run_traffic() launches, without Mininet or wall clock.
+
+    hosts is a list of (name, ip). The same generator and draw order as
+    run_traffic are used, but the 0.2 s poll loop is replayed on a simulated
+    clock and ports are released exactly at start + duration. run_traffic
+    polls on wall-clock time (sleep jitter shifts which tick fires a flow) and
+    releases a port only once iperf3 has exited, so a pool can be empty there
+    and not here; after the first such difference the two traces diverge.
+    start_ts is relative to the start of the episode.
+    """
+    rng = random.Random(seed)
+    pools = {name: {"mice": PortPool(MICE_PORTS, rng),
+                    "elephant": PortPool(ELE_PORTS, rng),
+                    "shock": PortPool(SHOCK_PORTS, rng)} for name, _ in hosts}
+    ips = dict(hosts)
+    names = [name for name, _ in hosts]
+    active: List[FlowSpec] = []
+    specs: List[FlowSpec] = []
+
+    next_m = rng.uniform(*mice_interval)
+    next_e = rng.uniform(*ele_interval)
+    next_s = rng.uniform(*shock_interval)
+    fid = 0
+    now = 0.0
+    while now < duration_s:
+        do_m, do_e, do_s, next_m, next_e, next_s = schedule(
+            now, next_m, next_e, next_s, mice_interval, ele_interval, shock_interval, rng
+        )
+        todo = (["mice"] if do_m else []) + (["elephant"] if do_e else []) + (["shock", "shock"] if do_s else [])
+        for ftype in todo:
+            src, dst = choose_pair(names, rng)
+            p = pools[dst][pool_key(ftype)].acquire()
+            if p is None:
+                continue
+            fid += 1
+            dur, rate = draw_size(ftype, mice_dur, ele_dur, mice_rate, ele_rate, rng)
+            spec = FlowSpec(f"f{fid:06d}", src, dst, ips[dst], p, "udp", rate, dur, ftype, now)
+            active.append(spec)
+            specs.append(spec)
+        still = []
+        for spec in active:
+            if now >= spec.start_ts + spec.duration_s:
+                pools[spec.dst][pool_key(spec.flow_type)].release(spec.dst_port)
+            else:
+                still.append(spec)
+        active = still
+        now += tick_s
+    return specs
+
+def load_trace(flows_csv: str) -> List[FlowSpec]:
+    """Read a logged flows.csv back as FlowSpecs with start_ts relative to the first flow."""
+    import csv
+    with open(flows_csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    t0 = min((float(r["start_ts"]) for r in rows), default=0.0)
+    return [FlowSpec(r["flow_id"], r["src"], r["dst"], r["dst_ip"], int(r["dst_port"]), r["proto"],
+                     float(r["rate_mbps"]), int(r["duration_s"]), r["flow_type"], float(r["start_ts"]) - t0)
+            for r in rows]
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Gym-style vectorized environment over the fluid simulator.
+
+VecFluidEnv steps N independent networks (same topology, per-env traffic
+seeds) in lockstep inside one process; ProcVecEnv shards N across worker
+processes. Both return batched arrays:
+
+  obs      (N, 5)  S1..S5 = mean_util, max_util, drop_rate, throughput_mbps, active_flows
+  rewards  (N,)    reward_proxy of the returned obs, i.e. of the state the action led to
+                   (rewards.proxy_next); the R column run_experiment/fluidsim log scores the
+                   state the action was chosen in, so compare against proxy_next-relabeled runs
+  dones    (N,)    episode reached duration_s / step_s steps
+  infos    dict of (N, ...) arrays: t, link_util (N, E), final_obs
+
+With auto_reset a finished env is immediately restarted on a fresh trace
+(seed += total env count, also inside ProcVecEnv shards) and obs holds its
+first observation; the last observation of the finished episode is in
+infos["final_obs"].
+
+Benchmark:
+  python3 -m sdnppo_mn.vec_env --topo leafspine --n_envs 1,8,64 --workers 1,2,4 --steps 500
+"""
+import argparse
+import multiprocessing as mp
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from .fluidsim import FluidSim, build
+from .rewards import reward_proxy_batch
+from .traffic import synth_trace
+
+class VecFluidEnv:
+    def __init__(self, topo_name: str = "leafspine", n_envs: int = 4, seeds: Optional[List[int]] = None,
+                 duration_s: int = 480, step_s: float = 2.0, bw: int = 20, delay: str = "1ms",
+                 link_cap_mbps: float = 20.0, rate_min_kbps: int = 2000, rate_max_kbps: int = 20000,
+                 auto_reset: bool = True, topo_kw: Optional[dict] = None, seed_stride: Optional[int] = None):
+        self.net = build(topo_name, bw, delay, link_cap_mbps, **(topo_kw or {}))
+        self.n_envs = int(n_envs)
+        self.seeds = list(seeds) if seeds is not None else list(range(1, self.n_envs + 1))
+        if len(self.seeds) != self.n_envs:
+            raise ValueError("need one seed per env")
+        # auto-reset seed increment; the total env count when this is one shard of a ProcVecEnv
+        self.seed_stride = int(seed_stride) if seed_stride is not None else self.n_envs
+        self.duration_s = int(duration_s)
+        self.step_s = float(step_s)
+        self.max_steps = int(self.duration_s / self.step_s)
+        self.auto_reset = auto_reset
+        self.steps = np.zeros(self.n_envs, dtype=np.int64)
+        self.sim = FluidSim(self.net, [self._trace(s) for s in self.seeds],
+                            rate_min_kbps=rate_min_kbps, rate_max_kbps=rate_max_kbps)
+
+    @property
+    def obs_dim(self) -> int:
+        return 5
+
+    @property
+    def n_links(self) -> int:
+        return self.net.n_edges
+
+    def _trace(self, seed: int):
+        return synth_trace(self.net.host_ips, self.duration_s, seed=seed)
+
+    def reset(self, seeds: Optional[List[int]] = None) -> np.ndarray:
+        if seeds is not None:
+            self.seeds = list(seeds)
+        self.sim.set_traces({i: self._trace(s) for i, s in enumerate(self.seeds)})
+        self.sim.set_u(0.5)
+        self.steps[:] = 0
+        return self.sim.states()
+
+    def step(self, actions):
+        self.sim.set_u(np.asarray(actions, dtype=np.float64).reshape(self.n_envs))
+        self.sim.advance(self.step_s)
+        self.steps += 1
+        obs = self.sim.states()
+        rewards = reward_proxy_batch(obs)
+        dones = self.steps >= self.max_steps
+        infos = {
+            "t": self.sim.t.copy(),
+            "link_util": self.sim.edge_tx / self.net.link_cap_mbps,
+            "final_obs": obs.copy(),
+        }
+        if self.auto_reset and dones.any():
+            idx = np.flatnonzero(dones)
+            for i in idx:
+                self.seeds[i] += self.seed_stride
+            self.sim.set_traces({int(i): self._trace(self.seeds[i]) for i in idx})
+            self.sim.u[idx] = 0.5
+            self.steps[idx] = 0
+            obs[idx] = self.sim.latest[idx]
+        return obs, rewards, dones, infos
+
+def _worker(conn, kwargs):
+    env = VecFluidEnv(**kwargs)
+    while True:
+        cmd, arg = conn.recv()
+        if cmd == "step":
+            conn.send(env.step(arg))
+        elif cmd == "reset":
+            conn.send(env.reset(arg))
+        elif cmd == "close":
+            conn.close()
+            return
+
+class ProcVecEnv:
+    """VecFluidEnv shards in n_workers processes; same interface, results concatenated."""
+
+    def __init__(self, n_envs: int = 4, n_workers: int = 2, seeds: Optional[List[int]] = None, **kwargs):
+        seeds = list(seeds) if seeds is not None else list(range(1, n_envs + 1))
+        n_workers = max(1, min(n_workers, n_envs))
+        self.n_envs = n_envs
+        self.bounds = np.linspace(0, n_envs, n_workers + 1).astype(int)
+        ctx = mp.get_context("fork")
+        self.conns, self.procs = [], []
+        for w in range(n_workers):
+            lo, hi = self.bounds[w], self.bounds[w + 1]
+            parent, child = ctx.Pipe()
+            kw = dict(kwargs, n_envs=int(hi - lo), seeds=seeds[lo:hi], seed_stride=n_envs)
+            p = ctx.Process(target=_worker, args=(child, kw), daemon=True)
+            p.start()
+            self.conns.append(parent)
+            self.procs.append(p)
+
+    def reset(self, seeds: Optional[List[int]] = None) -> np.ndarray:
+        for w, c in enumerate(self.conns):
+            c.send(("reset", None if seeds is None else seeds[self.bounds[w]:self.bounds[w + 1]]))
+        return np.concatenate([c.recv() for c in self.conns])
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.float64).reshape(self.n_envs)
+        for w, c in enumerate(self.conns):
+            c.send(("step", actions[self.bounds[w]:self.bounds[w + 1]]))
+        parts = [c.recv() for c in self.conns]
+        obs = np.concatenate([p[0] for p in parts])
+        rewards = np.concatenate([p[1] for p in parts])
+        dones = np.concatenate([p[2] for p in parts])
+        infos = {k: np.concatenate([p[3][k] for p in parts]) for k in parts[0][3]}
+        return obs, rewards, dones, infos
+
+    def close(self):
+        for c in self.conns:
+            c.send(("close", None))
+        for p in self.procs:
+            p.join(timeout=5.0)
+
+def bench(topo_name: str, n_envs: int, n_workers: int, steps: int, duration_s: int, step_s: float,
+          topo_kw: Optional[dict] = None) -> float:
+    """Environment steps/sec (n_envs * steps / wall time) with random actions."""
+    kw = dict(topo_name=topo_name, duration_s=duration_s, step_s=step_s, topo_kw=topo_kw)
+    env = VecFluidEnv(n_envs=n_envs, **kw) if n_workers <= 1 else ProcVecEnv(n_envs=n_envs, n_workers=n_workers, **kw)
+    rng = np.random.default_rng(0)
+    env.reset()
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        env.step(rng.uniform(0.05, 0.95, size=n_envs))
+    el = time.perf_counter() - t0
+    if isinstance(env, ProcVecEnv):
+        env.close()
+    return n_envs * steps / el
+
+def main():
+    from .run_experiment import TOPOS, add_topo_args, topo_params
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--topo", choices=TOPOS, default="leafspine")
+    ap.add_argument("--n_envs", default="1,4,16,64")
+    ap.add_argument("--workers", default="1,2,4")
+    ap.add_argument("--steps", type=int, default=500)
+    ap.add_argument("--duration_s", type=int, default=480)
+    ap.add_argument("--step_s", type=float, default=2.0)
+    add_topo_args(ap)
+    args = ap.parse_args()
+
+    print(f"topo={args.topo} steps={args.steps} cpus={mp.cpu_count()}")
+    print(f"{'n_envs':>7} {'workers':>7} {'env_steps/s':>12} {'sim_x_realtime':>15}")
+    for n in [int(x) for x in args.n_envs.split(",") if x]:
+        for w in [int(x) for x in args.workers.split(",") if x]:
+            if w > n:
+                continue
+            sps = bench(args.topo, n, w, args.steps, args.duration_s, args.step_s,
+                        topo_kw=topo_params(args.topo, args))
+            print(f"{n:>7} {w:>7} {sps:>12.0f} {sps * args.step_s:>15.0f}")
+
+if __name__ == "__main__":
+    main()